@@ -0,0 +1,28 @@
+"""Add task_counts version
+
+Revision ID: 5d2a8e4f7b63
+Revises: 3e8f5c7a9d12
+Create Date: 2025-11-27 14:18:03.562941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a8e4f7b63'
+down_revision: Union[str, Sequence[str], None] = '3e8f5c7a9d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task_counts', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('task_counts', 'version')
@@ -0,0 +1,32 @@
+"""Add tasks owner/status/priority index
+
+Revision ID: 7c2e9a4b1d35
+Revises: 409076cc6413
+Create Date: 2025-11-18 10:24:37.412093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a4b1d35'
+down_revision: Union[str, Sequence[str], None] = '409076cc6413'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_owner_status_priority_id',
+        'tasks',
+        ['owner_id', 'status', 'priority', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_owner_status_priority_id', table_name='tasks')
@@ -0,0 +1,54 @@
+"""Add blobs and files tables
+
+Revision ID: 8a3f1c6d2b94
+Revises: 5d2a8e4f7b63
+Create Date: 2026-10-18 10:42:17.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f1c6d2b94'
+down_revision: Union[str, Sequence[str], None] = '5d2a8e4f7b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_table('files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('blob_sha256', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['blob_sha256'], ['blobs.sha256'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_files_id'), 'files', ['id'], unique=False)
+    op.create_index(op.f('ix_files_blob_sha256'), 'files', ['blob_sha256'], unique=False)
+    op.create_index('ix_files_owner_id_name', 'files', ['owner_id', 'name'], unique=True)
+    # Files already uploaded stay where they are, under the flat
+    # <owner_id>_<name> layout, and are served from there
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_files_owner_id_name', table_name='files')
+    op.drop_index(op.f('ix_files_blob_sha256'), table_name='files')
+    op.drop_index(op.f('ix_files_id'), table_name='files')
+    op.drop_table('files')
+    op.drop_table('blobs')
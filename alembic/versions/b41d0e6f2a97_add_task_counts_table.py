@@ -0,0 +1,50 @@
+"""Add task_counts table
+
+Revision ID: b41d0e6f2a97
+Revises: 7c2e9a4b1d35
+Create Date: 2025-11-20 16:02:11.850314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41d0e6f2a97'
+down_revision: Union[str, Sequence[str], None] = '7c2e9a4b1d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_counts',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED', name='taskstatus', native_enum=False, length=20), nullable=False),
+    sa.Column('priority', sa.Enum('LOW', 'MEDIUM', 'HIGH', 'URGENT', name='taskpriority', native_enum=False, length=20), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_id', 'status', 'priority')
+    )
+
+    # Backfill from existing tasks; from here on CRUDTask keeps the rows current
+    op.execute(
+        """
+        INSERT INTO task_counts (owner_id, status, priority, count)
+        SELECT owner_id,
+               COALESCE(CAST(status AS VARCHAR(20)), 'PENDING'),
+               COALESCE(CAST(priority AS VARCHAR(20)), 'MEDIUM'),
+               COUNT(*)
+        FROM tasks
+        GROUP BY owner_id,
+                 COALESCE(CAST(status AS VARCHAR(20)), 'PENDING'),
+                 COALESCE(CAST(priority AS VARCHAR(20)), 'MEDIUM')
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('task_counts')
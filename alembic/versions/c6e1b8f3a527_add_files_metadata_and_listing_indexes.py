@@ -0,0 +1,39 @@
+"""Add files metadata and listing indexes
+
+Revision ID: c6e1b8f3a527
+Revises: 8a3f1c6d2b94
+Create Date: 2026-10-18 13:05:42.918374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e1b8f3a527'
+down_revision: Union[str, Sequence[str], None] = '8a3f1c6d2b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('files', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.add_column('files', sa.Column('content_type', sa.String(length=100), server_default='application/octet-stream', nullable=False))
+    # Backfill sizes from the blobs; content types of existing files stay generic
+    op.execute("UPDATE files SET size = (SELECT size FROM blobs WHERE blobs.sha256 = files.blob_sha256)")
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.alter_column('size', existing_type=sa.BigInteger(), nullable=False)
+    op.create_index('ix_files_owner_id_id', 'files', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_files_owner_id_size_id', 'files', ['owner_id', 'size', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_files_owner_id_size_id', table_name='files')
+    op.drop_index('ix_files_owner_id_id', table_name='files')
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_column('content_type')
+        batch_op.drop_column('size')
@@ -0,0 +1,36 @@
+"""Add tasks owner/id index
+
+Revision ID: e3b7d1a9c4f2
+Revises: c6e1b8f3a527
+Create Date: 2025-12-09 14:12:05.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7d1a9c4f2'
+down_revision: Union[str, Sequence[str], None] = 'c6e1b8f3a527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build the index without blocking writes to tasks
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_owner_id_id',
+            'tasks',
+            ['owner_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_owner_id_id', table_name='tasks', postgresql_concurrently=True)
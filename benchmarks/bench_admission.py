@@ -0,0 +1,113 @@
+"""
+    GET /tasks/ latency during a login flood, with admission control off and
+    with the ADMISSION_* defaults. Flood clients log in back to back and back
+    off for Retry-After when refused, as well-behaved clients do.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_admission.py --flood 64 --seconds 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import AsyncGenerator, Dict, List
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core import admission
+from app.core.database import Base
+from app.core.security import create_access_token, get_password_hash
+from app.crud.task import task as crud_task
+from app.main import task_app
+from app.models.database import User
+from app.models.task import TaskCreate
+
+PASSWORD = "BenchPassword1"
+
+
+def percentile(values: List[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else float("nan")
+
+
+async def run(client: AsyncClient, flood: int, readers: int, seconds: float) -> Dict[str, List[float]]:
+    deadline = time.perf_counter() + seconds
+    results: Dict[str, List[float]] = {"tasks": [], "login_ok": [], "login_refused": []}
+    headers = {"Authorization": f"Bearer {create_access_token('bench')}"}
+
+    async def login() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post("/auth/login/access-token", data={"username": "bench", "password": PASSWORD})
+            elapsed = time.perf_counter() - start
+            if response.status_code == 503:
+                results["login_refused"].append(elapsed)
+                await asyncio.sleep(float(response.headers["Retry-After"]))
+            else:
+                results["login_ok"].append(elapsed)
+
+    async def read() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get("/tasks/", params={"limit": 20}, headers=headers)
+            assert response.status_code == 200, response.text
+            results["tasks"].append(time.perf_counter() - start)
+
+    await asyncio.gather(*(login() for _ in range(flood)), *(read() for _ in range(readers)))
+    return results
+
+
+async def main(flood: int, readers: int, seconds: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # A file database, so requests contend for a real queue pool
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [{
+                "id": 1, "username": "bench", "email": "bench@example.com",
+                "hashed_password": get_password_hash(PASSWORD),
+            }])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            await crud_task.create_many_with_owner(db, objs_in=[
+                TaskCreate(title=f"Task {i}", description="d" * 120) for i in range(100)
+            ], owner_id=1)
+
+        async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+            async with session_factory() as session:
+                yield session
+
+        task_app.dependency_overrides[deps.get_db] = override_get_db
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+        configured = dict(admission.limiters)
+
+        print(f"{'admission':<10} {'tasks req/s':>11} {'tasks p50':>10} {'tasks p95':>10}"
+              f" {'logins ok':>10} {'login p95':>10} {'refused':>8}")
+        async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench", timeout=None) as client:
+            for label, limiters in (("off", {}), ("on", configured)):
+                admission.limiters.clear()
+                admission.limiters.update(limiters)
+                results = await run(client, flood, readers, seconds)
+                tasks, ok = results["tasks"], results["login_ok"]
+                print(
+                    f"{label:<10} {len(tasks) / seconds:>11.1f} {percentile(tasks, 50) * 1000:>7.1f} ms"
+                    f" {percentile(tasks, 95) * 1000:>7.1f} ms {len(ok):>10}"
+                    f" {percentile(ok, 95) * 1000:>7.0f} ms {len(results['login_refused']):>8}"
+                )
+
+        admission.limiters.update(configured)
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flood", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent GET /tasks/ clients")
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.flood, args.readers, args.seconds))
@@ -0,0 +1,83 @@
+"""
+    Per-request authentication overhead: token verification and the
+    get_current_active_user dependency chain, with and without caches.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_auth.py --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.core.database import Base
+from app.crud.user import user_cache
+from app.models.database import User
+
+
+def report(label: str, seconds: float, iterations: int) -> None:
+    print(f"{label:<40} {seconds / iterations * 1e6:>10.1f} us/request")
+
+
+def time_sync(fn: Callable[[], object], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return time.perf_counter() - start
+
+
+async def main(iterations: int) -> None:
+    token = security.create_access_token("bench")
+
+    def jose_decode() -> None:
+        jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+    def cold_verify() -> None:
+        security.claims_cache.clear()
+        security.decode_access_token(token)
+
+    report("jose.jwt.decode", time_sync(jose_decode, iterations), iterations)
+    report("decode_access_token (cache miss)", time_sync(cold_verify, iterations), iterations)
+    security.decode_access_token(token)
+    report("decode_access_token (cache hit)", time_sync(lambda: security.decode_access_token(token), iterations), iterations)
+
+    # The full dependency chain against an in-memory database
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+        ])
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        async def authenticate(cold: bool) -> float:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                if cold:
+                    security.claims_cache.clear()
+                    user_cache.clear()
+                user = await deps.get_current_user(db=db, token=credentials)
+                await deps.get_current_active_user(current_user=user)
+            return time.perf_counter() - start
+
+        report("get_current_active_user (cold caches)", await authenticate(cold=True), iterations)
+        report("get_current_active_user (warm caches)", await authenticate(cold=False), iterations)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,70 @@
+"""
+    Blob lookups (the os.stat behind storage.find_blob) and stores (creating a
+    new file) with --blobs blobs in one flat directory, as before sharding,
+    versus the sharded layout at each depth. Cold lookups drop the page cache
+    first, which needs root; otherwise the numbers are warm-cache only.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_blob_layout.py --blobs 100000 300000
+"""
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+from app.core import storage
+
+
+def drop_caches() -> bool:
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3")
+        return True
+    except OSError:
+        return False
+
+
+def time_each(paths: List[str], action) -> float:  # type: ignore[no-untyped-def]
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        action(path)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def main(counts: List[int], depths: List[int], samples: int) -> None:
+    print(f"{'blobs':>8} {'depth':>6} {'lookup':>10} {'cold lookup':>12} {'store':>10}")
+    for count in counts:
+        shas = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count + samples)]
+        stored, new = shas[:count], shas[count:]
+        for depth in depths:
+            with tempfile.TemporaryDirectory(dir=".") as tmp:
+                for sha in stored:
+                    path = storage.blob_path(tmp, sha, depth)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    open(path, "xb").close()
+                lookups = [storage.blob_path(tmp, sha, depth) for sha in random.sample(stored, samples)]
+                warm = time_each(lookups, os.stat)
+                cold = time_each(lookups, os.stat) if drop_caches() else float("nan")
+
+                def store(path: str) -> None:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    open(path, "xb").close()
+
+                stores = time_each([storage.blob_path(tmp, sha, depth) for sha in new], store)
+            print(f"{count:>8} {depth:>6} {warm:>7.1f} us {cold:>9.1f} us {stores:>7.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blobs", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--samples", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.blobs, args.depths, args.samples)
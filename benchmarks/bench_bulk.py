@@ -0,0 +1,73 @@
+"""
+    Task import throughput: one POST /tasks/ per task vs POST /tasks/bulk.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_bulk.py --tasks 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import AsyncGenerator
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.main import task_app
+from app.models.database import User
+
+
+async def main(n_tasks: int, batch_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+            ])
+
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+            async with session_factory() as session:
+                yield session
+
+        task_app.dependency_overrides[deps.get_db] = override_get_db
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+        headers = {"Authorization": f"Bearer {create_access_token('bench')}"}
+        payload = [{"title": f"Task {i}", "description": "imported"} for i in range(n_tasks)]
+
+        transport = ASGITransport(app=task_app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            for item in payload:
+                response = await client.post("/tasks/", json=item, headers=headers)
+                response.raise_for_status()
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for offset in range(0, n_tasks, batch_size):
+                response = await client.post("/tasks/bulk", json=payload[offset:offset + batch_size], headers=headers)
+                response.raise_for_status()
+            bulk = time.perf_counter() - start
+
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+    print(f"{n_tasks} tasks, bulk batch size {batch_size}")
+    print(f"per-task POST /tasks/   : {single:8.2f}s  {n_tasks / single:10.0f} tasks/s")
+    print(f"POST /tasks/bulk        : {bulk:8.2f}s  {n_tasks / bulk:10.0f} tasks/s")
+    print(f"speedup                 : {single / bulk:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.batch_size))
@@ -0,0 +1,69 @@
+"""
+    Polling cost of GET /tasks/ and GET /tasks/{id}: full responses vs 304s
+    for clients that send back the ETag.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_conditional.py --requests 500
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import AsyncGenerator
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.crud.task import task as crud_task
+from app.main import task_app
+from app.models.database import User
+from app.models.task import TaskCreate
+
+
+async def main(requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+            ])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            created = await crud_task.create_many_with_owner(db, objs_in=[
+                TaskCreate(title=f"Task {i}", description="d" * 120, due_date=datetime(2030, 1, 1))
+                for i in range(100)
+            ], owner_id=1)
+
+        async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+            async with session_factory() as session:
+                yield session
+
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+        headers = {"Authorization": f"Bearer {create_access_token('bench')}"}
+        print(f"{'request':<22} {'status':>6} {'latency':>12} {'body':>10}")
+        async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench") as client:
+            for path in ("/tasks/", f"/tasks/{created[0].id}"):
+                etag = (await client.get(path, headers=headers)).headers["ETag"]
+                for conditional in ({}, {"If-None-Match": etag}):
+                    start = time.perf_counter()
+                    for _ in range(requests):
+                        response = await client.get(path, headers={**headers, **conditional})
+                    elapsed = (time.perf_counter() - start) / requests
+                    print(f"{path:<22} {response.status_code:>6} {elapsed * 1000:>9.2f} ms {len(response.content):>8} B")
+
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
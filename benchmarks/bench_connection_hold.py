@@ -0,0 +1,102 @@
+"""
+    Pooled-connection hold time per request vs total request time, with and
+    without handing connections back before non-database work.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_connection_hold.py --requests 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import Any, Awaitable, Callable, Dict, List
+from unittest import mock
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.database import Base
+from app.crud import user as crud_user_module
+from app.crud.task import stats_cache
+from app.crud.user import user_cache
+from app.main import task_app
+from app.models.database import Task
+from app.routers import files, tasks as tasks_router
+
+
+async def run(requests: int, release: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as patches:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        database.AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        database.ReplicaSessionLocals = []
+        files.UPLOAD_DIR = tmp
+        user_cache.clear()
+        stats_cache.clear()
+        if not release:
+            async def keep(session: AsyncSession) -> None:
+                pass
+            for module in (database, crud_user_module, tasks_router):
+                patches.enter_context(mock.patch.object(module, "release_connection", keep))
+
+        holds: List[float] = []
+        checked_out_at: Dict[int, float] = {}
+        event.listen(engine.sync_engine.pool, "checkout",
+                     lambda conn, record, proxy: checked_out_at.__setitem__(id(record), time.perf_counter()))
+        event.listen(engine.sync_engine.pool, "checkin",
+                     lambda conn, record: holds.append(time.perf_counter() - checked_out_at.pop(id(record))))
+
+        async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench") as client:
+            await client.post("/auth/register", json={
+                "username": "bench", "email": "bench@example.com", "password": "BenchPassword123"
+            })
+            token = (await client.post("/auth/login", json={
+                "username": "bench", "password": "BenchPassword123"
+            })).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            async with engine.begin() as conn:
+                await conn.execute(insert(Task), [
+                    {"title": f"Task {i}", "description": "x" * 200, "owner_id": 1} for i in range(100)
+                ])
+            upload = b"x" * (4 * 1024 * 1024)
+
+            scenarios: Dict[str, Callable[[], Awaitable[Any]]] = {
+                "POST /auth/login": lambda: client.post("/auth/login", json={
+                    "username": "bench", "password": "BenchPassword123"
+                }),
+                "GET /tasks/ (100 rows)": lambda: client.get("/tasks/", headers=headers),
+                "GET /tasks/stats": lambda: client.get("/tasks/stats", headers=headers),
+                "POST /upload (4 MB)": lambda: client.post(
+                    "/upload", files={"file": ("bench.txt", upload)}, headers=headers
+                ),
+            }
+            for name, call in scenarios.items():
+                n = 3 if "login" in name else requests
+                holds.clear()
+                start = time.perf_counter()
+                for _ in range(n):
+                    (await call()).raise_for_status()
+                elapsed = (time.perf_counter() - start) / n
+                held = sum(holds) / n
+                print(f"{'release' if release else 'hold':>8} {name:<24} {elapsed * 1000:>9.2f} ms "
+                      f"{held * 1000:>9.2f} ms {held / elapsed:>7.0%}")
+
+        await engine.dispose()
+
+
+async def main(requests: int) -> None:
+    print(f"{'mode':>8} {'request':<24} {'latency':>12} {'held':>12} {'share':>7}")
+    await run(requests, release=False)
+    await run(requests, release=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,97 @@
+"""
+    Disk usage and disk writes for a duplicate-heavy upload workload: --users
+    users each upload the same attachment, plus one file of their own.
+
+    "stored" is the size of everything left under the upload directory.
+    "disk writes" is what the process dirtied and did not delete before it
+    reached the disk (write_bytes - cancelled_write_bytes from /proc/self/io,
+    Linux only), measured after a sync.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_dedup.py --users 200 --size 1
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Dict
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.main import task_app
+from app.models.database import User
+from app.routers import files
+
+
+def disk_writes() -> float:
+    try:
+        with open("/proc/self/io") as f:
+            fields: Dict[str, int] = {k: int(v) for k, v in (line.split(": ") for line in f)}
+    except OSError:
+        return float("nan")
+    return fields["write_bytes"] - fields["cancelled_write_bytes"]
+
+
+def tree_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    )
+
+
+async def main(users: int, size_mib: int) -> None:
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+                for i in range(1, users + 1)
+            ])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_db() -> AsyncIterator[AsyncSession]:
+            async with session_factory() as session:
+                yield session
+
+        task_app.dependency_overrides[deps.get_db] = override_get_db
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+        files.UPLOAD_DIR = upload_dir = os.path.join(tmp, "uploads")
+        files.MAX_FILE_SIZE = size_mib * 1024 * 1024
+        attachment = os.urandom(size_mib * 1024 * 1024)
+
+        os.sync()
+        writes_before, uploaded = disk_writes(), 0
+        start = time.perf_counter()
+        async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench") as client:
+            for i in range(1, users + 1):
+                headers = {"Authorization": f"Bearer {create_access_token(f'user{i}')}"}
+                for name, content in (("attachment.pdf", attachment), ("own.txt", f"notes of user {i}".encode())):
+                    response = await client.post("/upload", files={"file": (name, content)}, headers=headers)
+                    assert response.status_code == 200, response.text
+                    uploaded += len(content)
+        elapsed = time.perf_counter() - start
+        os.sync()
+        writes = disk_writes() - writes_before
+
+        mib = 1024 * 1024
+        print(f"uploads      {users * 2:>10}  ({elapsed:.1f} s)")
+        print(f"uploaded     {uploaded / mib:>10.1f} MiB")
+        print(f"stored       {tree_size(upload_dir) / mib:>10.1f} MiB")
+        print(f"disk writes  {writes / mib:>10.1f} MiB  (files and the SQLite database)")
+
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--size", type=int, default=1, help="attachment size in MiB")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.size))
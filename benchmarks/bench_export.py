@@ -0,0 +1,110 @@
+"""
+    Peak memory and time to first byte of GET /tasks/export as the export grows.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_export.py --tasks 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.main import task_app
+from app.models.database import Task, User
+
+
+async def export_once(n_tasks: int, format: str) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+            ])
+            batch = 20_000
+            for start in range(0, n_tasks, batch):
+                await conn.execute(insert(Task), [
+                    {"title": f"Task {i}", "description": "exported row", "owner_id": 1}
+                    for i in range(start, min(start + batch, n_tasks))
+                ])
+
+        task_app.dependency_overrides[deps.get_session_factory] = lambda: async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        headers = {"Authorization": f"Bearer {create_access_token('bench')}"}
+
+        # get_current_active_user still needs a request session
+        async def override_get_db():  # type: ignore[no-untyped-def]
+            async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+                yield session
+        task_app.dependency_overrides[deps.get_db] = override_get_db
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+
+        # Drive the ASGI app directly: httpx's ASGITransport buffers the whole
+        # body, which would hide both the first-byte time and the memory profile.
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/tasks/export", "raw_path": b"/tasks/export",
+            "query_string": f"format={format}".encode(), "root_path": "",
+            "headers": [(b"host", b"bench"), *((k.lower().encode(), v.encode()) for k, v in headers.items())],
+            "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        }
+        first_byte = None
+        received = 0
+
+        request_sent = False
+        disconnected = asyncio.Event()
+
+        async def receive():  # type: ignore[no-untyped-def]
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Starlette listens for a disconnect while streaming; hold it open
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):  # type: ignore[no-untyped-def]
+            nonlocal first_byte, received
+            if message["type"] == "http.response.body" and message.get("body"):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                received += len(message["body"])
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        await task_app(scope, receive, send)
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+    print(
+        f"{n_tasks:>9} {format:>7} {received / 1e6:>9.1f} MB {first_byte * 1000:>10.1f} ms "  # type: ignore[operator]
+        f"{total:>8.2f} s {peak / 1e6:>10.2f} MB"
+    )
+
+
+async def main(sizes: list[int], formats: list[str]) -> None:
+    print(f"{'tasks':>9} {'format':>7} {'body':>12} {'first byte':>13} {'total':>10} {'peak alloc':>13}")
+    for n_tasks in sizes:
+        for format in formats:
+            await export_once(n_tasks, format)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--format", choices=["ndjson", "csv"], nargs="+", default=["ndjson", "csv"])
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.format))
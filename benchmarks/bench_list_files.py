@@ -0,0 +1,90 @@
+"""
+    GET /files latency for a user with --own files, as the total number of
+    files stored for all users grows. For comparison, "directory scan" times
+    what the listing used to do: os.listdir() over a flat directory holding
+    every user's files, filtered by the owner's prefix.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_list_files.py --totals 10000 100000 --own 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import AsyncIterator, List
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.main import task_app
+from app.models.database import Blob, File, User
+
+USERS = 1000
+SHA256 = "0" * 64
+
+
+async def main(totals: List[int], own: int, requests: int) -> None:
+    print(f"{'total files':>12} {'GET /files p50':>15} {'directory scan':>15}")
+    for total in totals:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(insert(User), [
+                    {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+                    for i in range(1, USERS + 1)
+                ])
+                await conn.execute(insert(Blob), [{"sha256": SHA256, "size": 1, "ref_count": total}])
+                # User 1 has `own` files; the rest are spread over everyone else
+                owners = [1] * own + [2 + i % (USERS - 1) for i in range(total - own)]
+                await conn.execute(insert(File), [
+                    {"owner_id": owner, "name": f"file{i}.txt", "blob_sha256": SHA256, "size": i % 997}
+                    for i, owner in enumerate(owners)
+                ])
+            session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+            async def override_get_db() -> AsyncIterator[AsyncSession]:
+                async with session_factory() as session:
+                    yield session
+
+            task_app.dependency_overrides[deps.get_db] = override_get_db
+            task_app.dependency_overrides[deps.get_read_db] = override_get_db
+            headers = {"Authorization": f"Bearer {create_access_token('user1')}"}
+            timings = []
+            async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench") as client:
+                for i in range(requests + 1):
+                    start = time.perf_counter()
+                    response = await client.get("/files", params={"sort": "size", "limit": 50}, headers=headers)
+                    assert response.status_code == 200, response.text
+                    if i:  # the first request warms up the caches
+                        timings.append(time.perf_counter() - start)
+            task_app.dependency_overrides.clear()
+            await engine.dispose()
+
+            flat = os.path.join(tmp, "flat")
+            os.mkdir(flat)
+            for i, owner in enumerate(owners):
+                open(os.path.join(flat, f"{owner}_file{i}.txt"), "wb").close()
+            scans = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                assert len([f for f in os.listdir(flat) if f.startswith("1_")]) == own
+                scans.append(time.perf_counter() - start)
+
+        print(f"{total:>12} {statistics.median(timings) * 1000:>12.2f} ms"
+              f" {statistics.median(scans) * 1000:>12.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--totals", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--own", type=int, default=200, help="files belonging to the listing user")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.totals, args.own, args.requests))
@@ -0,0 +1,107 @@
+"""
+    GET /tasks/ throughput and allocations per 100-row page: the column-projected
+    fast path vs the previous ORM objects + response_model validation.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_list_serialization.py --requests 500
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, AsyncGenerator
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.crud.task import task as crud_task
+from app.main import task_app
+from app.models.database import Task, User
+from app.models.task import TaskCreate, TaskListResponse
+
+# The list endpoint as it was: full ORM rows, re-validated into TaskListResponse
+legacy_app = FastAPI()
+
+@legacy_app.get("/tasks/", response_model=TaskListResponse)
+async def legacy_read_tasks(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    tasks = await crud_task.get_tasks_by_owner(db, owner_id=owner_id, limit=101)
+    counts = await crud_task.get_counts(db, owner_id=owner_id)
+    by_status: dict[Any, int] = {}
+    by_priority: dict[Any, int] = {}
+    for row in counts:
+        by_status[row.status] = by_status.get(row.status, 0) + row.count
+        by_priority[row.priority] = by_priority.get(row.priority, 0) + row.count
+    return {
+        "tasks": tasks[:100], "total": sum(by_status.values()), "page": 1, "per_page": 100,
+        "next_cursor": "x", "by_status": by_status, "by_priority": by_priority,
+    }
+
+
+async def measure(label: str, app: FastAPI, headers: dict[str, str], requests: int) -> None:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(20):
+            (await client.get("/tasks/", headers=headers)).raise_for_status()
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            (await client.get("/tasks/", headers=headers)).raise_for_status()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        peak = 0
+        for _ in range(20):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            (await client.get("/tasks/", headers=headers)).raise_for_status()
+            peak += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+    print(f"{label:<20} {requests / elapsed:>10.0f} req/s {elapsed / requests * 1000:>9.2f} ms "
+          f"{peak / 20 / 1024:>10.0f} KiB")
+
+
+async def main(requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+            ])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            await crud_task.create_many_with_owner(db, objs_in=[
+                TaskCreate(title=f"Task {i}", description="d" * 120, due_date=datetime(2030, 1, 1))
+                for i in range(500)
+            ], owner_id=1)
+
+        async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+            async with session_factory() as session:
+                yield session
+
+        headers = {"Authorization": f"Bearer {create_access_token('bench')}"}
+        print(f"{'path':<20} {'throughput':>14} {'latency':>12} {'peak alloc':>14}")
+        for label, app in (("orm + validation", legacy_app), ("projected rows", task_app)):
+            app.dependency_overrides[deps.get_read_db] = override_get_db
+            await measure(label, app, headers, requests)
+            app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
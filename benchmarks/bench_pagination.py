@@ -0,0 +1,97 @@
+"""
+    Offset vs keyset pagination latency as page depth grows.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_pagination.py --tasks 200000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.crud.task import task as crud_task
+from app.models.database import Task, User
+from app.models.task import TaskPriority, TaskStatus
+
+PAGE_SIZE = 100
+
+
+async def seed(session: AsyncSession, n_tasks: int) -> None:
+    await session.execute(insert(User), [
+        {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"},
+        {"id": 2, "username": "other", "email": "other@example.com", "hashed_password": "x"},
+    ])
+    priorities = list(TaskPriority)
+    statuses = list(TaskStatus)
+    batch = 10_000
+    for start in range(0, n_tasks, batch):
+        await session.execute(insert(Task), [
+            {
+                "title": f"Task {i}",
+                # Interleave another owner's rows so owner filtering matters
+                "owner_id": 1 if i % 4 else 2,
+                "priority": priorities[i % len(priorities)],
+                "status": statuses[i % len(statuses)],
+            }
+            for i in range(start, min(start + batch, n_tasks))
+        ])
+    await session.commit()
+
+
+async def time_page(session: AsyncSession, repeats: int, **kwargs: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await crud_task.get_tasks_by_owner(session, owner_id=1, limit=PAGE_SIZE, **kwargs)
+        samples.append(time.perf_counter() - start)
+        session.expunge_all()
+    return statistics.median(samples) * 1000
+
+
+async def main(n_tasks: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            await seed(session, n_tasks)
+
+            owned = n_tasks * 3 // 4
+            print(f"{n_tasks} tasks, {owned} owned by the benchmark user, page size {PAGE_SIZE}")
+            print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+
+            page = 1
+            while (page - 1) * PAGE_SIZE < owned:
+                skip = (page - 1) * PAGE_SIZE
+                # The keyset equivalent of `skip` is the id of the last row on the previous page
+                previous = await crud_task.get_tasks_by_owner(
+                    session, owner_id=1, skip=max(skip - 1, 0), limit=1
+                )
+                after_id = int(previous[0].id) if skip else None  # type: ignore[arg-type]
+
+                offset_ms = await time_page(session, repeats, skip=skip)
+                keyset_ms = await (
+                    time_page(session, repeats, after_id=after_id)
+                    if after_id is not None
+                    else time_page(session, repeats)
+                )
+                print(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+                page *= 4
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.repeats))
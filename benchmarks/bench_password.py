@@ -0,0 +1,56 @@
+"""
+    Event-loop stall during a burst of password verifications: inline bcrypt
+    versus the bounded password executor.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_password.py --logins 32
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import security
+
+
+async def measure(label: str, logins: int, verify) -> None:  # type: ignore[no-untyped-def]
+    hashed = security.get_password_hash("secret")
+    worst_stall = 0.0
+    done = False
+
+    async def heartbeat() -> None:
+        # A well-behaved loop wakes this every millisecond
+        nonlocal worst_stall
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst_stall = max(worst_stall, time.perf_counter() - before - 0.001)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(verify("secret", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await beat
+    print(f"{label:<28} {elapsed * 1000:>9.0f} ms total {worst_stall * 1000:>9.1f} ms worst loop stall")
+
+
+async def main(logins: int, concurrency: int) -> None:
+    async def inline(plain: str, hashed: str) -> bool:
+        return security.verify_password(plain, hashed)
+
+    await measure("inline", logins, inline)
+    for kind in ("thread", "process"):
+        executor = security.PasswordExecutor(kind=kind, max_concurrency=concurrency)
+        await executor.verify("warm", security.get_password_hash("warm"))
+        await measure(f"{kind} pool (cap {concurrency})", logins, executor.verify)
+        print(f"{'':<28} {executor.stats()}")
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
@@ -0,0 +1,92 @@
+"""
+    GET /tasks/search latency against a LIKE '%q%' scan as the task table grows.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_search.py --tasks 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.crud.task import task as crud_task
+from app.models.database import Task, User
+
+WORDS = (
+    "invoice report meeting review deploy backup kitchen garden budget design "
+    "release hiring travel dentist insurance migrate refactor benchmark laundry taxes"
+).split()
+
+
+async def search_once(n_tasks: int, queries: int) -> None:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": owner, "username": f"user{owner}", "email": f"user{owner}@example.com", "hashed_password": "x"}
+                for owner in range(1, 11)
+            ])
+            batch = 20_000
+            for start in range(0, n_tasks, batch):
+                await conn.execute(insert(Task), [
+                    {
+                        "title": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+                        "description": " ".join(rng.choices(WORDS, k=12)),
+                        "owner_id": i % 10 + 1,
+                    }
+                    for i in range(start, min(start + batch, n_tasks))
+                ])
+
+        async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+            async def timed(run, terms: list[str]) -> float:  # type: ignore[no-untyped-def]
+                start = time.perf_counter()
+                for term in terms:
+                    await run(term)
+                return (time.perf_counter() - start) / len(terms) * 1000
+
+            async def fts(word: str) -> None:
+                await crud_task.search(db, owner_id=1, q=word, limit=20)
+
+            async def like(word: str) -> None:
+                pattern = f"%{word}%"
+                await db.execute(
+                    select(Task)
+                    .where(Task.owner_id == 1, or_(Task.title.like(pattern), Task.description.like(pattern)))
+                    .order_by(Task.id).limit(20)
+                )
+
+            # Common words match half the table, so every match has to be ranked;
+            # a selective term (one title's number) is what the index is for
+            common = [WORDS[q % len(WORDS)] for q in range(queries)]
+            selective = [str(rng.randrange(n_tasks // 10) * 10) for _ in range(queries)]
+            common_fts, common_like = await timed(fts, common), await timed(like, common)
+            rare_fts, rare_like = await timed(fts, selective), await timed(like, selective)
+
+        await engine.dispose()
+
+    print(
+        f"{n_tasks:>9} {common_fts:>10.2f} ms {common_like:>10.2f} ms "
+        f"{rare_fts:>10.2f} ms {rare_like:>10.2f} ms"
+    )
+
+
+async def main(sizes: list[int], queries: int) -> None:
+    print(f"{'tasks':>9} {'common fts':>13} {'common like':>13} {'rare fts':>13} {'rare like':>13}")
+    for n_tasks in sizes:
+        await search_once(n_tasks, queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.queries))
@@ -0,0 +1,122 @@
+"""
+    Worker boot cost: time from a fresh interpreter to the first served request,
+    split into importing app.main, create_app(), the lifespan startup (engines
+    and pool warm-up) and the first request, plus peak RSS and the memory the
+    worker doesn't share. Each run is a new process, as a new worker would be;
+    medians are reported.
+
+    "fresh process" boots a worker from scratch. "forked worker" imports and
+    builds the app in a parent and forks the worker from it, as a preloading
+    process manager does: the worker then only runs the lifespan, and shares
+    the imported code with its parent copy-on-write.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PHASES = ("import", "create_app", "startup", "first_request", "total")
+
+
+def private_mib() -> float:
+    # Memory only this process uses (not shared copy-on-write with a parent); Linux only
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith("Private_"))
+    except OSError:
+        return float("nan")
+    return sum(int(value.split()[0]) for value in fields.values()) / 1024
+
+
+def boot(forked: bool) -> None:
+    # One worker boot, timed phase by phase; run in a fresh interpreter. With
+    # `forked`, the import and create_app() happen in a parent that then forks
+    # the worker, the way a preloading process manager starts its workers.
+    import resource
+    start = time.perf_counter()
+    import app.main
+    imported = time.perf_counter()
+    task_app = app.main.create_app()
+    created = time.perf_counter()
+
+    import asyncio
+    from httpx import ASGITransport, AsyncClient
+
+    if forked:
+        pid = os.fork()
+        if pid:
+            os.waitpid(pid, 0)
+            return
+        start = imported = created = time.perf_counter()
+
+    async def serve() -> float:
+        async with task_app.router.lifespan_context(task_app):
+            started = time.perf_counter()
+            async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench") as client:
+                response = await client.get("/")
+            assert response.status_code == 200
+            return started
+
+    started = asyncio.run(serve())
+    # The first request is timed up to its response, not to the shutdown after it
+    served = time.perf_counter()
+    print(json.dumps({
+        "import": imported - start,
+        "create_app": created - imported,
+        "startup": started - created,
+        "first_request": served - started,
+        "total": served - start,
+        "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "private_mib": private_mib(),
+    }), flush=True)
+    if forked:
+        os._exit(0)
+
+
+def main(runs: int, database_url: str | None) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}",
+            # Absolute, since the children run from the temp dir
+            "PYTHONPATH": os.pathsep.join(os.path.abspath(p) for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p),
+        }
+        results = {}
+        for mode in ("fresh", "forked"):
+            samples = results[mode] = []
+            for _ in range(runs):
+                # The working directory is the temp dir, so any files created at import show up there
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--boot", mode],
+                    cwd=tmp, env=env, check=True, capture_output=True, text=True,
+                ).stdout
+                samples.append(json.loads(output))
+        leftovers = sorted(set(os.listdir(tmp)) - {"bench.db"})
+
+    print(f"{'median':<16} {'fresh process':>14} {'forked worker':>14}")
+    for phase in PHASES:
+        cells = [statistics.median(s[phase] for s in results[mode]) * 1000 for mode in ("fresh", "forked")]
+        print(f"{phase:<16}" + "".join(f"{cell:>11.1f} ms" for cell in cells))
+    for key, label in (("rss_mib", "peak rss"), ("private_mib", "private memory")):
+        cells = [statistics.median(s[key] for s in results[mode]) for mode in ("fresh", "forked")]
+        print(f"{label:<16}" + "".join(f"{cell:>10.1f} MiB" for cell in cells))
+    print(f"files created in the working directory: {leftovers or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="defaults to a temp SQLite file")
+    parser.add_argument("--boot", choices=("fresh", "forked"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.boot:
+        boot(forked=args.boot == "forked")
+    else:
+        main(args.runs, args.database_url)
@@ -0,0 +1,102 @@
+"""
+    Dashboard load: paging through GET /tasks/ and aggregating on the client
+    vs one GET /tasks/stats (cold and cached).
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_stats.py --tasks 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.crud.task import stats_cache
+from app.main import task_app
+from app.models.database import Task, User
+from app.models.task import TaskPriority, TaskStatus
+
+
+async def main(n_tasks: int, repeats: int) -> None:
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+            ])
+            await conn.execute(insert(Task), [
+                {
+                    "title": f"Task {i}", "owner_id": 1,
+                    "status": rng.choice(list(TaskStatus)), "priority": rng.choice(list(TaskPriority)),
+                    "due_date": now + timedelta(hours=rng.randint(-500, 500)),
+                }
+                for i in range(n_tasks)
+            ])
+
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+            async with session_factory() as session:
+                yield session
+
+        task_app.dependency_overrides[deps.get_db] = override_get_db
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+        headers = {"Authorization": f"Bearer {create_access_token('bench')}"}
+
+        transport = ASGITransport(app=task_app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            pages = 0
+            by_status: Counter[str] = Counter()
+            params: dict[str, str] = {}
+            while True:
+                response = await client.get("/tasks/", params=params, headers=headers)
+                response.raise_for_status()
+                data = response.json()
+                pages += 1
+                by_status.update(t["status"] for t in data["tasks"])
+                if not data["next_cursor"]:
+                    break
+                params = {"cursor": data["next_cursor"]}
+            paged = time.perf_counter() - start
+
+            cold = 0.0
+            for _ in range(repeats):
+                stats_cache.clear()
+                start = time.perf_counter()
+                (await client.get("/tasks/stats", headers=headers)).raise_for_status()
+                cold += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                (await client.get("/tasks/stats", headers=headers)).raise_for_status()
+            warm = time.perf_counter() - start
+
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+    print(f"{'client-side aggregation':<26} {paged * 1000:>10.1f} ms ({pages} pages)")
+    print(f"{'/tasks/stats (uncached)':<26} {cold / repeats * 1000:>10.1f} ms")
+    print(f"{'/tasks/stats (cached)':<26} {warm / repeats * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.repeats))
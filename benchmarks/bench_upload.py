@@ -0,0 +1,89 @@
+"""
+    Peak memory allocated while POST /upload handles one file, for a range of
+    file sizes (tracemalloc, so Python allocations only). The request body is
+    generated chunk by chunk, so the client side adds nothing to the peak.
+
+    Run from the repository root:
+        PYTHONPATH=src python benchmarks/bench_upload.py --sizes 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import AsyncIterator, List
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.core.config import settings
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.main import task_app
+from app.models.database import User
+from app.routers import files
+
+BOUNDARY = "benchboundary"
+NETWORK_CHUNK = 64 * 1024  # what a server typically hands the app per receive()
+
+
+async def multipart_body(size: int) -> AsyncIterator[bytes]:
+    yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"bench.pdf\"\r\n"
+           "Content-Type: application/octet-stream\r\n\r\n").encode()
+    block = b"x" * NETWORK_CHUNK
+    for offset in range(0, size, NETWORK_CHUNK):
+        yield block[:min(NETWORK_CHUNK, size - offset)]
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def main(sizes: List[int]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [{
+                "id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x",
+            }])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_db() -> AsyncIterator[AsyncSession]:
+            async with session_factory() as session:
+                yield session
+
+        task_app.dependency_overrides[deps.get_db] = override_get_db
+        task_app.dependency_overrides[deps.get_read_db] = override_get_db
+        files.UPLOAD_DIR = os.path.join(tmp, "uploads")
+        files.MAX_FILE_SIZE = max(sizes) * 1024 * 1024
+        headers = {
+            "Authorization": f"Bearer {create_access_token('bench')}",
+            "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+        }
+
+        print(f"chunk size {settings.UPLOAD_CHUNK_BYTES // 1024} KiB")
+        print(f"{'file size':>10} {'peak memory':>12} {'time':>9}")
+        async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://bench") as client:
+            # Warm-up, so imports and caches aren't counted
+            response = await client.post("/upload", content=multipart_body(1024), headers=headers)
+            assert response.status_code == 200, response.text
+            for mib in sizes:
+                tracemalloc.start()
+                start = time.perf_counter()
+                response = await client.post("/upload", content=multipart_body(mib * 1024 * 1024), headers=headers)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                assert response.status_code == 200, response.text
+                print(f"{mib:>6} MiB {peak / 1024:>8.0f} KiB {elapsed * 1000:>6.0f} ms")
+
+        task_app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32], help="file sizes in MiB")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
@@ -1,41 +1,86 @@
-from typing import AsyncGenerator
-from fastapi import Depends, HTTPException, status
+import math
+import time
+from typing import AsyncGenerator, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-from pydantic import ValidationError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.core import security
+from app.core import database, security
 from app.core.config import settings
-from app.core.database import AsyncSessionLocal
+from app.core.metrics import timed
 from app.crud.user import user as crud_user
 from app.models.database import User
 
 reusable_oauth2 = HTTPBearer()
 
-async def get_db() -> AsyncGenerator[AsyncSession]:
-    async with AsyncSessionLocal() as session:
+def _token_subject(request: Request) -> Optional[str]:
+    # The caller's token subject, if any; verified claims are cached so this is cheap
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    claims = security.decode_access_token(token)
+    return None if claims is None else claims.get("sub")
+
+# Signed time of the client's last write. Any worker that sees it inside the
+# read-your-writes window reads from the primary, not just the one that wrote.
+WRITE_COOKIE = "last_write"
+
+def _wrote_recently(request: Request) -> bool:
+    written_at = security.read_write_mark(request.cookies.get(WRITE_COOKIE))
+    return written_at is not None and time.time() - written_at < settings.REPLICA_READ_YOUR_WRITES_SECONDS
+
+async def get_db(request: Request, response: Response) -> AsyncGenerator[AsyncSession]:
+    # The request's session. It checks out a pooled connection at its first
+    # statement and returns it on commit, on release_connection or at the end
+    # of the request, whichever comes first.
+    async with database.AsyncSessionLocal() as session:
+        # Commits on this session keep the caller's reads on the primary for a while
+        session.info["subject"] = _token_subject(request)
+        session.info["on_write"] = lambda: response.set_cookie(
+            WRITE_COOKIE, security.sign_write_mark(time.time()),
+            max_age=math.ceil(settings.REPLICA_READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax",
+        )
         yield session
 
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession]:
+    # For routes that only read: served by a replica when one is configured
+    session = await database.open_read_session(
+        subject=_token_subject(request), wrote_recently=_wrote_recently(request)
+    )
+    async with session:
+        yield session
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    # For streaming responses: their body is produced after request-scoped
+    # dependencies (and the get_db session) have been closed, so they open
+    # their own session from this factory.
+    return database.AsyncSessionLocal
+
 async def get_current_user(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token: HTTPAuthorizationCredentials = Depends(reusable_oauth2)
 ) -> User:
-    try:
-        payload = jwt.decode(
-            token.credentials, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = payload.get("sub")
-    except (JWTError, ValidationError):
+    with timed("auth"):
+        payload = security.decode_access_token(token.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    token_data = payload.get("sub")
     
     if not token_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user = await crud_user.get_by_username(db, username=token_data)
+    with timed("auth"):
+        user = await crud_user.get_by_username_cached(db, username=token_data)
+        if user is None and db.info.get("replica"):
+            # A user registered moments ago may not have reached the replica yet
+            async with database.AsyncSessionLocal() as primary:
+                user = await crud_user.get_by_username_cached(primary, username=token_data)
+    # Whatever the route does next (possibly no database work at all) should not
+    # run while holding the connection used for the lookup
+    await database.release_connection(db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
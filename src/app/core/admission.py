@@ -0,0 +1,165 @@
+"""
+    Admission control: a cap on concurrent requests per route group, with a
+    bounded wait queue, so overload turns into quick 503s instead of latency
+    that grows for everyone.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import request_admission_wait
+
+
+class Limiter:
+    """
+    Lets at most `limit` requests run at once. Up to `queue_size` more wait, in
+    arrival order, for at most `queue_timeout` seconds; the rest are refused.
+    A finishing request hands its slot straight to the longest waiter.
+    """
+
+    def __init__(self, *, limit: int, queue_size: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0  # the queue was full
+        self.timed_out = 0  # waited queue_timeout without getting a slot
+        self._waiters: Deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if need be; False if refused."""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up waiting
+                if isinstance(e, TimeoutError):
+                    self.admitted += 1
+                    return True
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                self.timed_out += 1
+                return False
+            raise
+        # release() passed its slot (and its in_flight count) to this waiter
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            # Skip waiters cancelled (timed out) but not yet back to remove themselves
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+# Path prefix -> route group. Requests outside every group (/, /metrics,
+# /internal) are never limited, so health checks and scrapes get through.
+ROUTE_GROUPS: Sequence[Tuple[str, str]] = (
+    ("/auth", "auth"),
+    ("/tasks", "tasks"),
+    ("/upload", "files"),
+    ("/download", "files"),
+    ("/delete", "files"),
+    ("/files", "files"),
+)
+
+# One limiter per group in each worker process. Bcrypt-bound /auth requests
+# get their own small budget, so a login flood can't take the capacity cheap
+# /tasks reads need.
+limiters: Dict[str, Limiter] = {
+    group: Limiter(limit=limit, queue_size=queue_size, queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    for group, limit, queue_size in (
+        ("auth", settings.ADMISSION_AUTH_LIMIT, settings.ADMISSION_AUTH_QUEUE),
+        ("tasks", settings.ADMISSION_TASKS_LIMIT, settings.ADMISSION_TASKS_QUEUE),
+        ("files", settings.ADMISSION_FILES_LIMIT, settings.ADMISSION_FILES_QUEUE),
+    )
+    # A limit of 0 leaves the group unlimited
+    if limit > 0
+}
+
+
+def route_group(path: str) -> Optional[str]:
+    for prefix, group in ROUTE_GROUPS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return group
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    Admits each request through its route group's limiter, answering 503 with
+    Retry-After when the group's queue is full or the wait runs out. Runs before
+    routing, authentication and any database work, so refusing is cheap.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: Dict[str, Limiter] = limiters) -> None:
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        group = route_group(scope["path"]) if scope["type"] == "http" else None
+        limiter = self.limiters.get(group) if group is not None else None
+        if group is None or limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        admitted = await limiter.acquire()
+        request_admission_wait.observe((group,), time.perf_counter() - start)
+        if not admitted:
+            await self._busy(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _busy(self, send: Send) -> None:
+        body = json.dumps({"detail": "Server is busy, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
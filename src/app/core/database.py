@@ -1,30 +1,250 @@
 """
     Database configuration and connection setup.
 """
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from itertools import count
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from app.core.config import settings
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings
 
 
-# Engine : Engine is used to manage the connection pool to the database.
-engine = create_async_engine(url=settings.DATABASE_URL, echo=True)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that also counts checkouts which found every connection busy and
+    had to wait for one to be returned, how long they waited, and how many gave
+    up after pool_timeout.
+    """
 
-# Session Local : This is a factory for creating new AsyncSession instances.
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        # Mirrors QueuePool._do_get: a checkout blocks only when no connection is
+        # idle and the overflow is used up
+        if self._max_overflow < 0 or self.overflow() < self._max_overflow or self.checkedin() > 0:
+            return super()._do_get()
+
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.waits += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def engine_options(settings: Settings, database_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Keyword arguments for create_async_engine, taken from the DB_* settings.
+    `database_url` defaults to DATABASE_URL; replicas pass their own.
+    """
+    url = make_url(database_url or settings.DATABASE_URL)
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO}
+
+    # SQLite gets SQLAlchemy's default single-connection pools; sizing only
+    # applies to server databases
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    if url.get_driver_name() == "asyncpg":
+        # asyncpg's own statement cache and SQLAlchemy's cache of prepared
+        # statements; both must be 0 behind pgbouncer in transaction mode
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """Current state of a connection pool, for sizing it against the worker count."""
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    if isinstance(pool, InstrumentedPool):
+        stats.update(
+            waits=pool.waits,
+            wait_seconds_total=pool.wait_seconds_total,
+            wait_seconds_max=pool.wait_seconds_max,
+            timeouts=pool.timeouts,
+        )
+    return stats
+
+
+# Token subjects that committed a write recently. Replicas lag the primary, so
+# these subjects read from the primary until their entry expires.
+recent_writers: TTLCache[str, bool] = TTLCache(
+    maxsize=100_000, ttl=settings.REPLICA_READ_YOUR_WRITES_SECONDS
+)
+# Indexes of replicas that failed to connect, skipped until their entry expires
+unavailable_replicas: TTLCache[int, bool] = TTLCache(
+    maxsize=1, ttl=settings.REPLICA_RETRY_SECONDS  # resized by init_engine
 )
+_replica_turn = count()
+
+# The primary and replica engines and their session factories. Nothing connects
+# or even imports a DBAPI driver at import time: they are created by
+# init_engine, which the app's lifespan calls in each worker process, or on
+# first access to one of these attributes (see __getattr__).
+engine: AsyncEngine
+AsyncSessionLocal: async_sessionmaker[AsyncSession]
+replica_engines: List[AsyncEngine]
+ReplicaSessionLocals: List[async_sessionmaker[AsyncSession]]
+_ENGINE_ATTRIBUTES = ("engine", "AsyncSessionLocal", "replica_engines", "ReplicaSessionLocals")
+
+
+def init_engine(settings: Settings = settings) -> None:
+    """Create the engines and session factories, replacing any existing ones."""
+    global engine, AsyncSessionLocal, replica_engines, ReplicaSessionLocals
+    # Engine : Engine is used to manage the connection pool to the database.
+    engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings))
+    # Session Local : This is a factory for creating new AsyncSession instances.
+    AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    # Read replicas, each with its own pool sized like the primary's
+    replica_engines = [
+        create_async_engine(url, **engine_options(settings, url)) for url in settings.DATABASE_REPLICA_URLS
+    ]
+    ReplicaSessionLocals = [
+        async_sessionmaker(bind=replica, class_=AsyncSession, expire_on_commit=False)
+        for replica in replica_engines
+    ]
+    unavailable_replicas.maxsize = max(len(replica_engines), 1)
+    unavailable_replicas.clear()
+
+
+async def warm_pool(connections: int) -> None:
+    """
+    Open up to `connections` pooled connections at once and return them idle, so
+    the first requests don't pay for connecting (and pre-ping proves the database
+    is reachable before the worker takes traffic).
+    """
+    _ensure_engine()
+    if isinstance(engine.pool, AsyncAdaptedQueuePool):
+        connections = min(connections, engine.pool.size())
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+
+
+async def dispose_engine() -> None:
+    """Close every pooled connection; the next use creates fresh engines."""
+    if "engine" not in globals():
+        return
+    for each in (engine, *replica_engines):
+        await each.dispose()
+    for name in _ENGINE_ATTRIBUTES:
+        globals().pop(name, None)
+
+
+def __getattr__(name: str) -> Any:
+    # Outside the app's lifespan (scripts, tests) the engines appear on first use
+    if name in _ENGINE_ATTRIBUTES:
+        init_engine()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _ensure_engine() -> None:
+    # Module-level __getattr__ doesn't cover bare names used inside this module
+    if "engine" not in globals():
+        init_engine()
+
+# Sessions note when their current transaction has written anything, so reads
+# can hand their connection back early and commits know whether they wrote
+@event.listens_for(Session, "after_flush")
+def _flushed(session: Session, flush_context: UOWTransaction) -> None:
+    session.info["wrote"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session: Session) -> None:
+    # deps.get_db tags request sessions with the token subject, and a callback
+    # that hands the client its own record of the write
+    if not session.info.pop("wrote", False):
+        return
+    subject = session.info.get("subject")
+    if subject is not None:
+        recent_writers.set(subject, True)
+    on_write = session.info.get("on_write")
+    if on_write is not None:
+        on_write()
 
-# Dependency to get DB session (to be used in FastAPI routes
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def release_connection(session: AsyncSession) -> None:
+    """
+    Hand the session's connection back to the pool once its reads are done, ahead
+    of slow work that needs no database (password hashing, file I/O, response
+    serialization). close() detaches loaded objects without expiring them, so they
+    stay readable, and the session checks out a new connection if used again.
+    Sessions holding uncommitted writes are left as they are.
+    """
+    if session.new or session.dirty or session.deleted or session.info.get("wrote"):
+        return
+    await session.close()
 
-    # Uses context manager to ensure session is properly closed after use
-    async with AsyncSessionLocal() as session:
-        # this sytnax allows yielding the session for use in routes
-        yield session
+async def open_read_session(*, subject: Optional[str] = None, wrote_recently: bool = False) -> AsyncSession:
+    """
+    Session for read-only work: the next healthy replica in round-robin order,
+    or the primary when there are no replicas, none can be reached, or the
+    caller wrote within the read-your-writes window (`wrote_recently`, or a
+    write by `subject` this process saw). Replica sessions have info["replica"].
+    """
+    _ensure_engine()
+    wrote_recently = wrote_recently or (subject is not None and bool(recent_writers.get(subject)))
+    if ReplicaSessionLocals and not wrote_recently:
+        start = next(_replica_turn)
+        for offset in range(len(ReplicaSessionLocals)):
+            index = (start + offset) % len(ReplicaSessionLocals)
+            if unavailable_replicas.get(index):
+                continue
+            session = ReplicaSessionLocals[index]()
+            try:
+                # Check out a connection now so an unreachable replica falls
+                # through to the next one instead of failing the request
+                await session.connection()
+            except (exc.DBAPIError, OSError):
+                await session.close()
+                unavailable_replicas.set(index, True)
+                continue
+            session.info["replica"] = True
+            return session
+    return AsyncSessionLocal()
 
 # Base class for declarative models
 # Used by ORM models to inherit from.
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
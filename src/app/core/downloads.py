@@ -0,0 +1,182 @@
+"""
+    File downloads with byte ranges, so interrupted downloads resume and
+    viewers can seek: Range and If-Range (RFC 9110), multipart/byteranges for
+    several ranges, and If-None-Match revalidation against a strong ETag.
+
+    File contents go out through the ASGI zero-copy extensions when the server
+    offers them ("http.response.zerocopysend" hands it the open file, offset and
+    count to sendfile(); "http.response.pathsend" the path of a whole file), and
+    are otherwise read and sent 64 KiB at a time.
+"""
+import os
+import re
+import stat
+from secrets import token_hex
+from typing import List, Optional, Sequence, Tuple, Union
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+# More ranges than this in one request are ignored and the whole file is sent:
+# each range costs a part header and a seek, and overlapping lists are a known
+# way to make a server send a file many times over
+MAX_RANGES = 16
+
+_RANGE_SPEC = re.compile(r"(\d*)-(\d*)", re.ASCII)
+
+# A body is a sequence of literal bytes and (offset, count) slices of the file
+Segment = Union[bytes, Tuple[int, int]]
+
+
+def parse_ranges(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    The [start, end) byte ranges of a `Range` header, sorted, with overlapping
+    and adjacent ones merged. None if the header is to be ignored (malformed,
+    not bytes, too many ranges); empty if no range overlaps the file.
+    """
+    units, _, spec = header.partition("=")
+    specs = spec.split(",")
+    if units.strip().lower() != "bytes" or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for item in specs:
+        match = _RANGE_SPEC.fullmatch(item.strip())
+        if match is None or match.group(1) == match.group(2) == "":
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last) + 1, size) if last else size
+        else:
+            # Suffix range: the last N bytes, or the whole file if it's shorter
+            start, end = max(size - int(last), 0), size
+        if start < end:
+            ranges.append((start, end))
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison: weak, so W/"x" matches "x"; `*` matches any."""
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+class RangeFileResponse(FileResponse):
+    """A FileResponse with strict range handling and zero-copy sends; see the module docstring."""
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        # Strong, and cheap: size and nanosecond mtime change with any rewrite,
+        # including an upload atomically replacing the file
+        self.headers.setdefault("etag", f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"')
+        super().set_stat_headers(stat_result)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(self.stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(self.stat_result)
+        size = self.stat_result.st_size
+        request_headers = Headers(scope=scope)
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, self.headers["etag"]):
+            response = Response(status_code=304, headers={
+                name: self.headers[name] for name in ("etag", "last-modified", "accept-ranges")
+            })
+            return await response(scope, receive, send)
+
+        ranges = None
+        http_range, if_range = request_headers.get("range"), request_headers.get("if-range")
+        # If-Range: ranges of the copy the client has, else the whole (changed) file.
+        # Only a strong ETag or the exact Last-Modified date is a match.
+        if http_range is not None and self.status_code == 200 and (
+            if_range is None or if_range.strip() in (self.headers["etag"], self.headers["last-modified"])
+        ):
+            ranges = parse_ranges(http_range, size)
+        if ranges == []:
+            response = Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+            return await response(scope, receive, send)
+
+        segments: List[Segment]
+        if not ranges:
+            status_code, segments = self.status_code, [(0, size)]
+        elif len(ranges) == 1:
+            (start, end), status_code = ranges[0], 206
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+            self.headers["content-length"] = str(end - start)
+            segments = [(start, end - start)]
+        else:
+            status_code, segments = 206, self._multipart(ranges, size)
+            self.headers["content-length"] = str(
+                sum(len(s) if isinstance(s, bytes) else s[1] for s in segments)
+            )
+
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        extensions = scope.get("extensions") or {}
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif not ranges and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            await self._send_segments(send, segments, zerocopy="http.response.zerocopysend" in extensions)
+
+        if self.background is not None:
+            await self.background()
+
+    def _multipart(self, ranges: Sequence[Tuple[int, int]], size: int) -> List[Segment]:
+        # multipart/byteranges (RFC 9110 section 14.6), CRLF-delimited
+        boundary = token_hex(13)
+        content_type = self.headers["content-type"]
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        segments: List[Segment] = []
+        for start, end in ranges:
+            segments.append((
+                f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n"
+            ).encode("latin-1"))
+            segments.append((start, end - start))
+            segments.append(b"\r\n")
+        segments.append(f"--{boundary}--\r\n".encode("latin-1"))
+        return segments
+
+    async def _send_segments(self, send: Send, segments: Sequence[Segment], zerocopy: bool) -> None:
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for segment in segments:
+                if isinstance(segment, bytes):
+                    await send({"type": "http.response.body", "body": segment, "more_body": True})
+                    continue
+                offset, count = segment
+                if zerocopy:
+                    # The server sends it straight from the file descriptor
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped,
+                        "offset": offset,
+                        "count": count,
+                        "more_body": True,
+                    })
+                    continue
+                await file.seek(offset)
+                while count > 0:
+                    chunk = await file.read(min(self.chunk_size, count))
+                    if not chunk:
+                        raise RuntimeError(f"File at path {self.path} was truncated while sending.")
+                    count -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
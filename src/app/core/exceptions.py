@@ -28,3 +28,11 @@ class DuplicateError(HTTPException):
             status_code=status.HTTP_409_CONFLICT,
             detail=f"{resource} already exists"
         )
+
+class FileTooLargeError(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            # Literal: Starlette renamed the constant (413_REQUEST_ENTITY_TOO_LARGE -> 413_CONTENT_TOO_LARGE)
+            status_code=413,
+            detail=f"File size exceeds the maximum limit of {max_bytes} bytes"
+        )
@@ -0,0 +1,270 @@
+"""
+    In-process request metrics, rendered in the Prometheus text format.
+"""
+import functools
+import inspect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, ExceptionContext
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per combination of label values."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, labels: Sequence[str], value: float) -> None:
+        key = tuple(labels)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value, count + 1)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, (counts, total, count) in series:
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, f'le=\"{bound}\"')} {bucket_count}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, 'le=\"+Inf\"')} {count}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time to handle a request, by route template and status.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+request_db_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+request_admission_wait = Histogram(
+    "http_admission_wait_seconds", "Time requests queued for admission, by route group.",
+    ("group",), LATENCY_BUCKETS,
+)
+HISTOGRAMS = (request_duration, request_db_queries, request_db_seconds, request_admission_wait)
+
+
+@dataclass
+class Family:
+    """Point-in-time values of one gauge or counter, keyed by label values."""
+    name: str
+    kind: str
+    help: str
+    samples: Dict[Tuple[str, ...], float]
+    labelnames: Tuple[str, ...] = ()
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, value in sorted(self.samples.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+def render(families: Iterable[Family] = ()) -> str:
+    """Every histogram, followed by `families`, in the Prometheus text format."""
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for family in families:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestTimings:
+    """Where one request's time went; every duration is in seconds."""
+    started: float
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    auth_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    endpoint_returned: Optional[float] = None
+
+    def server_timing(self, total: float) -> str:
+        # Phases overlap: auth includes the user lookup, which is also DB time
+        return ", ".join((
+            f"auth;dur={self.auth_seconds * 1000:.2f}",
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_queries} queries"',
+            f"serialize;dur={self.serialize_seconds * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+
+
+# The timings of the request being handled. The object is created per request
+# and mutated in place, so copies of the context (thread pools, task groups,
+# SQLAlchemy's greenlets) all add to the same one.
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+class timed:
+    """Adds the time spent in the block to one phase of the current request."""
+
+    def __init__(self, phase: str) -> None:
+        self.attribute = f"{phase}_seconds"
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        timings = current_timings.get()
+        if timings is not None:
+            setattr(timings, self.attribute, getattr(timings, self.attribute) + time.perf_counter() - self.start)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    _query_finished(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context: ExceptionContext) -> None:
+    # A failed statement gets no after_cursor_execute: its start time would stay
+    # on the pooled connection for good. Failures outside a statement (connect,
+    # commit) never pushed one.
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is not None and conn.info.get("query_started"):
+        _query_finished(conn)
+
+
+def _query_finished(conn: Any) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    timings = current_timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_seconds += elapsed
+
+
+def _mark_returned(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Records when the endpoint returns, so the time from there to the response
+    # start (response_model validation, encoding, rendering) counts as serialization.
+    # functools.wraps keeps the signature FastAPI reads the parameters from.
+    if getattr(endpoint, "_marks_returned", False):
+        # include_router rebuilds routes from the already wrapped endpoint
+        return endpoint
+
+    def returned() -> None:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.endpoint_returned = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                returned()
+        async_wrapper._marks_returned = True  # type: ignore[attr-defined]
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            returned()
+    wrapper._marks_returned = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that reports when its endpoint returns, for the serialize timing."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _mark_returned(endpoint), **kwargs)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count and DB time per route template and status, and
+    adds a Server-Timing header to responses slower than
+    SERVER_TIMING_THRESHOLD_SECONDS. Pure ASGI, so it runs in the request's own
+    task and streaming bodies pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(started=time.perf_counter())
+        token = current_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timings.endpoint_returned is not None:
+                    timings.serialize_seconds += now - timings.endpoint_returned
+                total = now - timings.started
+                if total >= settings.SERVER_TIMING_THRESHOLD_SECONDS:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(total).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            # Unmatched paths share one label so scanners can't inflate cardinality
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or "unmatched"
+            method = scope["method"]
+            request_duration.observe((method, template, str(status)), time.perf_counter() - timings.started)
+            request_db_queries.observe((method, template), timings.db_queries)
+            request_db_seconds.observe((method, template), timings.db_seconds)
@@ -0,0 +1,30 @@
+"""
+    Opaque cursor tokens for keyset pagination.
+"""
+import base64
+import binascii
+import json
+from typing import Any
+
+from app.core.exceptions import ValidationError
+
+
+def encode_cursor(position: dict[str, Any]) -> str:
+    # The token is just the last row's sort key, JSON encoded and base64url'd.
+    # Clients should treat it as opaque and pass it back unchanged.
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str) -> dict[str, Any]:
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        raise ValidationError("Invalid pagination cursor")
+
+    if not isinstance(position, dict) or not isinstance(position.get("id"), int):
+        raise ValidationError("Invalid pagination cursor")
+    if not isinstance(position.get("page", 1), int):
+        raise ValidationError("Invalid pagination cursor")
+    return position
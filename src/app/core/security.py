@@ -1,20 +1,32 @@
-from datetime import datetime, timedelta
-from typing import Any, Union
+import asyncio
+import hashlib
+import hmac
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, TypeVar, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
 
+# Claims of recently verified tokens, keyed by the token's SHA-256 digest so
+# raw bearer tokens are never kept in memory. Entries never outlive `exp`.
+claims_cache: TTLCache[bytes, dict[str, Any]] = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta | None = None
 ) -> str:
     if expires_delta:
-        expire = datetime.now() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now() + timedelta(
+        expire = datetime.now(timezone.utc) + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode : dict[str, Any] = {"exp": expire, "sub": str(subject)}
@@ -28,12 +40,128 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_token(token: str) -> Union[str, None]:
+T = TypeVar("T")
+
+class PasswordExecutor:
+    """
+    Runs bcrypt hashing and verification in a dedicated thread or process pool so
+    they never block the event loop. At most `max_concurrency` calls run at once;
+    callers beyond that queue on a semaphore, and the time they spend waiting is
+    reported separately from the time spent hashing.
+    """
+
+    def __init__(self, *, kind: str, max_concurrency: int) -> None:
+        self.kind = kind
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[Executor] = None
+        # asyncio primitives belong to one event loop; recreated if the loop changes
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.waiting = 0
+        self.running = 0
+        self.calls = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.max_concurrency)
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self._slots.release()
+            finished = time.perf_counter()
+            self.calls += 1
+            self.wait_seconds_total += started - queued
+            self.wait_seconds_max = max(self.wait_seconds_max, started - queued)
+            self.hash_seconds_total += finished - started
+            self.hash_seconds_max = max(self.hash_seconds_max, finished - started)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "executor": self.kind,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "running": self.running,
+            "calls": self.calls,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+            "hash_seconds_total": self.hash_seconds_total,
+            "hash_seconds_max": self.hash_seconds_max,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+password_executor = PasswordExecutor(
+    kind=settings.PASSWORD_EXECUTOR, max_concurrency=settings.PASSWORD_MAX_CONCURRENCY
+)
+
+def decode_access_token(token: str) -> Union[dict[str, Any], None]:
+    """
+    Verify a bearer token and return its claims, or None if it is invalid or
+    expired. The claims are the caller's own copy: the cached dict is shared by
+    every request presenting the same token.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = claims_cache.get(digest)
+    if claims is not None:
+        return dict(claims)
+
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[ALGORITHM]
-        )
-        print("Payload: ", payload)
-        return payload.get("sub")
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    if isinstance(claims.get("exp"), (int, float)):
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        claims_cache.set(digest, dict(claims), ttl=ttl)
+    return claims
+
+def verify_token(token: str) -> Union[str, None]:
+    claims = decode_access_token(token)
+    if claims is None:
+        return None
+    return claims.get("sub")
+
+def sign_write_mark(written_at: float) -> str:
+    """A tamper-proof `<unix ms>.<hmac>` record of when a client last wrote, for its cookie."""
+    stamp = str(int(written_at * 1000))
+    return f"{stamp}.{_write_mark_digest(stamp)}"
+
+def read_write_mark(mark: Optional[str]) -> Optional[float]:
+    """When the client last wrote, per a mark from sign_write_mark; None if absent or forged."""
+    stamp, _, digest = (mark or "").partition(".")
+    if not stamp.isdigit() or not hmac.compare_digest(digest, _write_mark_digest(stamp)):
+        return None
+    return int(stamp) / 1000
+
+def _write_mark_digest(stamp: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"write:{stamp}".encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,114 @@
+"""
+    On-disk layout of uploaded files, under the upload directory:
+
+        blobs/ab/cd/abcd...  File contents, content-addressed: each distinct
+                             content is stored once, named by its SHA-256. The
+                             files table maps each owner's file names to blobs.
+
+    Blobs are sharded into UPLOAD_SHARD_DEPTH levels of subdirectories named
+    after the hash's leading hex digit pairs, so no directory holds more than a
+    few thousand entries even with millions of blobs. Single lookups are hashed
+    by the filesystem either way (deeper shards cost a little more when cold,
+    see benchmarks/bench_blob_layout.py); what sharding avoids is the per-
+    directory entry limit (about 10 million on ext4 without large_dir) and
+    backups, rsync or ls having to read one directory of millions of entries.
+
+    Older layouts are still read while UPLOAD_LEGACY_LAYOUT is on, and moved
+    into the current one by `migrate-uploads` (app/migrate_uploads.py):
+
+        blobs/<sha256>, or any other shard depth   blobs stored before sharding
+        <owner_id>_<name>                          files uploaded before blobs
+
+    Blobs are placed and retired while the caller's transaction holds the blob
+    row (see CRUDFile.attach and detach), so an upload reusing a blob and a
+    delete dropping its last reference can't interleave.
+"""
+import os
+from secrets import token_hex
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+
+BLOB_DIR = "blobs"
+# Shard depths the old layouts may use, besides the configured one
+SHARD_DEPTHS = range(4)
+
+
+def blob_path(upload_dir: str, sha256: str, depth: Optional[int] = None) -> str:
+    """Where the blob `sha256` goes in the layout sharded `depth` levels deep (default: the configured one)."""
+    depth = settings.UPLOAD_SHARD_DEPTH if depth is None else depth
+    shards = [sha256[2 * level:2 * level + 2] for level in range(depth)]
+    return os.path.join(upload_dir, BLOB_DIR, *shards, sha256)
+
+
+def blob_paths(upload_dir: str, sha256: str) -> List[str]:
+    """Every path the blob may be stored at, the configured layout's first."""
+    paths = [blob_path(upload_dir, sha256)]
+    if settings.UPLOAD_LEGACY_LAYOUT:
+        paths += [
+            blob_path(upload_dir, sha256, depth) for depth in SHARD_DEPTHS if depth != settings.UPLOAD_SHARD_DEPTH
+        ]
+    return paths
+
+
+def find_blob(upload_dir: str, sha256: str) -> Optional[str]:
+    paths = blob_paths(upload_dir, sha256)
+    if len(paths) > 1:
+        # Tried again last: migrate-uploads links a blob at its new path before
+        # unlinking the old one, so a blob missed at both has since arrived
+        paths.append(paths[0])
+    return next((path for path in paths if os.path.isfile(path)), None)
+
+
+def legacy_path(upload_dir: str, owner_id: int, name: str) -> str:
+    return os.path.join(upload_dir, f"{owner_id}_{name}")
+
+
+def store_blob(upload_dir: str, temp_path: str, sha256: str) -> bool:
+    """
+    Move a received temp file into place as the blob `sha256`, or, when that
+    blob is already stored, just remove the temp file. True if it was moved.
+    """
+    if find_blob(upload_dir, sha256) is not None:
+        # Removed before the kernel writes it back, a duplicate's temp file
+        # usually never reaches the disk
+        os.remove(temp_path)
+        return False
+    path = blob_path(upload_dir, sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(temp_path, path)
+    return True
+
+
+def retire_blob(upload_dir: str, sha256: str) -> List[Tuple[str, str]]:
+    """
+    Rename the blob out of the way, wherever it is stored, ahead of deleting
+    it. Returns (path, retired path) pairs: purge them once the transaction
+    dropping the blob's row commits, restore them if it doesn't.
+    """
+    retired = []
+    for path in blob_paths(upload_dir, sha256):
+        moved = f"{path}.{token_hex(4)}.deleted"
+        try:
+            os.rename(path, moved)
+        except FileNotFoundError:
+            continue
+        retired.append((path, moved))
+    return retired
+
+
+def restore_blob(retired: List[Tuple[str, str]]) -> None:
+    for path, moved in retired:
+        os.replace(moved, path)
+
+
+def purge(retired: List[Tuple[str, str]]) -> None:
+    for _, moved in retired:
+        remove(moved)
+
+
+def remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
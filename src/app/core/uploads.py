@@ -0,0 +1,148 @@
+"""
+    Streaming file uploads: the file part of a multipart/form-data body is
+    written to a temp file as it arrives, so a request holds at most one chunk
+    of it in memory, and an oversized file is refused as soon as it passes the
+    limit instead of after it has been received in full. The contents are
+    hashed on the way through, for content-addressed storage.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from secrets import token_hex
+from typing import Callable, List, Optional, Tuple
+
+import aiofiles
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+from app.core.exceptions import FileTooLargeError, ValidationError
+
+# Allowance for the multipart framing (boundaries, part headers, small form
+# fields) on top of the file itself, when bounding the whole body
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+@dataclass
+class ReceivedFile:
+    filename: str  # the client's file name, without any directory part
+    path: str  # the temp file holding the contents, in the target directory
+    size: int
+    sha256: str  # hex digest of the contents
+
+
+async def receive_file(
+    request: Request,
+    *,
+    directory: str,
+    max_bytes: int,
+    chunk_size: int,
+    field: str = "file",
+    check_filename: Callable[[str], None] = lambda filename: None,
+) -> ReceivedFile:
+    """
+    Stream the `field` file part of the request body into a temp file in
+    `directory`, in writes of `chunk_size` bytes. `check_filename` runs as soon
+    as the part's headers arrive, before any of its contents are read, and
+    raises to refuse the file. The caller moves the temp file into place (a
+    rename, as it is on the same filesystem) or removes it.
+    """
+    _, params = parse_options_header(request.headers.get("content-type"))
+    if b"boundary" not in params:
+        raise ValidationError("Expected a multipart/form-data body")
+    # Refuse a declared oversized body before reading any of it
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise FileTooLargeError(max_bytes)
+
+    # The parser's callbacks are synchronous; they record events, which are
+    # handled (with awaited file writes) after each chunk of the body is fed in
+    events: List[Tuple[str, bytes]] = []
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: events.append(("part_begin", b"")),
+        "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", b"")),
+        "on_headers_finished": lambda: events.append(("headers_finished", b"")),
+        "on_part_data": lambda data, start, end: events.append(("part_data", data[start:end])),
+        "on_part_end": lambda: events.append(("part_end", b"")),
+    })
+
+    filename: Optional[str] = None
+    path: Optional[str] = None
+    out = None
+    in_file = done = False
+    header_name, header_value, disposition = b"", b"", b""
+    buffer = bytearray()
+    digest = hashlib.sha256()
+    size = received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise FileTooLargeError(max_bytes)
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise ValidationError("Malformed multipart body")
+
+            for kind, data in events:
+                if kind == "part_begin":
+                    header_name, header_value, disposition = b"", b"", b""
+                elif kind == "header_field":
+                    header_name += data
+                elif kind == "header_value":
+                    header_value += data
+                elif kind == "header_end":
+                    if header_name.lower() == b"content-disposition":
+                        disposition = header_value
+                    header_name, header_value = b"", b""
+                elif kind == "headers_finished":
+                    _, options = parse_options_header(disposition)
+                    # Only the first part named `field` is read; other parts are skipped
+                    if options.get(b"name") != field.encode() or b"filename" not in options or done:
+                        continue
+                    filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+                    if not filename:
+                        raise ValidationError("No file uploaded")
+                    check_filename(filename)
+                    # Created here rather than at import, which must not touch the filesystem
+                    os.makedirs(directory, exist_ok=True)
+                    # Hidden, so listings never show a partial upload. Created
+                    # ("x") rather than reopened and truncated ("w"), which ext4
+                    # answers by writing the file out on close: a temp file that's
+                    # then deleted (a duplicate upload) never reaches the disk.
+                    path = os.path.join(directory, f".upload-{token_hex(8)}.part")
+                    out = await aiofiles.open(path, "xb")
+                    in_file = True
+                elif kind == "part_data" and in_file:
+                    size += len(data)
+                    if size > max_bytes:
+                        raise FileTooLargeError(max_bytes)
+                    buffer += data
+                    if len(buffer) >= chunk_size:
+                        digest.update(buffer)
+                        await out.write(buffer)  # type: ignore[union-attr]
+                        buffer.clear()
+                elif kind == "part_end" and in_file:
+                    digest.update(buffer)
+                    await out.write(buffer)  # type: ignore[union-attr]
+                    buffer.clear()
+                    in_file, done = False, True
+            events.clear()
+        parser.finalize()
+
+        if not done or filename is None or path is None:
+            raise ValidationError("No file uploaded")
+        await out.close()  # type: ignore[union-attr]
+        return ReceivedFile(filename=filename, path=path, size=size, sha256=digest.hexdigest())
+    except BaseException:
+        # Refused, malformed, or the client went away: leave nothing behind
+        if out is not None:
+            await out.close()
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        raise
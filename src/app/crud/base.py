@@ -1,7 +1,7 @@
-from typing import Any, Dict, Generic, Optional, Sequence, Type, TypeVar, Union
+from typing import Any, Dict, Generic, Optional, Sequence, Tuple, Type, TypeVar, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import DeclarativeBase
 
 ModelType = TypeVar("ModelType", bound=DeclarativeBase)
@@ -30,6 +30,25 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def create_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        commit: bool = True
+    ) -> Sequence[ModelType]:
+        if not objs_in:
+            return []
+        rows = [obj if isinstance(obj, dict) else obj.model_dump() for obj in objs_in]
+
+        # A single multi-row INSERT ... RETURNING (split into pages by the dialect)
+        # instead of a commit and refresh SELECT per object.
+        result = await db.scalars(insert(self.model).returning(self.model), rows)
+        db_objs = result.all()
+        if commit:
+            await db.commit()
+        return db_objs
+
     async def update(
         self,
         db: AsyncSession,
@@ -50,8 +69,101 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def update_returning(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        owner_id: Optional[Any] = None,
+        commit: bool = True
+    ) -> Tuple[Optional[ModelType], bool]:
+        """
+        Update a row with one UPDATE ... WHERE id [AND owner_id] RETURNING statement.
+        Returns (obj, exists): obj is None with exists=True when the row belongs to another owner.
+        Pass commit=False to keep the transaction open for related writes.
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+
+        if not update_data:
+            # Nothing to change: just read the row under the same ownership filter
+            stmt: Any = select(self.model)
+        else:
+            stmt = update(self.model).values(**update_data).returning(self.model)
+        stmt = stmt.where(self.model.id == id)  # type: ignore[attr-defined]
+        if owner_id is not None:
+            stmt = stmt.where(self.model.owner_id == owner_id)  # type: ignore[attr-defined]
+
+        result = await db.execute(stmt.execution_options(populate_existing=True))
+        db_obj = result.scalar_one_or_none()
+        exists = db_obj is not None or await self._exists(db, id=id)
+        if commit:
+            await db.commit()
+        return db_obj, exists
+
+    async def update_many(
+        self, db: AsyncSession, *, objs_in: Sequence[Dict[str, Any]], commit: bool = True
+    ) -> Sequence[ModelType]:
+        # Each dict carries the primary key plus the fields to change
+        if not objs_in:
+            return []
+
+        # Bulk UPDATE by primary key runs as one executemany, then the changed
+        # rows are read back in one SELECT, all inside a single transaction.
+        await db.execute(update(self.model), list(objs_in))
+        result = await db.execute(
+            select(self.model)
+            .where(self.model.id.in_([obj["id"] for obj in objs_in]))  # type: ignore[attr-defined]
+            .execution_options(populate_existing=True)
+        )
+        db_objs = result.scalars().all()
+        if commit:
+            await db.commit()
+        return db_objs
+
     async def remove(self, db: AsyncSession, *, id: int) -> ModelType | None:
         obj = await self.get(db, id)
         await db.delete(obj)
         await db.commit()
         return obj
+
+    async def delete_returning(
+        self, db: AsyncSession, *, id: Any, owner_id: Optional[Any] = None, commit: bool = True
+    ) -> Tuple[Optional[ModelType], bool]:
+        """
+        Delete a row with one DELETE ... WHERE id [AND owner_id] RETURNING statement.
+        Returns (obj, exists) like update_returning.
+        """
+        stmt = delete(self.model).where(self.model.id == id)  # type: ignore[attr-defined]
+        if owner_id is not None:
+            stmt = stmt.where(self.model.owner_id == owner_id)  # type: ignore[attr-defined]
+
+        result = await db.execute(stmt.returning(self.model))
+        db_obj = result.scalar_one_or_none()
+        exists = db_obj is not None or await self._exists(db, id=id)
+        if commit:
+            await db.commit()
+        return db_obj, exists
+
+    async def _exists(self, db: AsyncSession, *, id: Any) -> bool:
+        # Only reached when a scoped write matched nothing, to tell 404 from 403
+        result = await db.execute(select(self.model.id).where(self.model.id == id))  # type: ignore[attr-defined]
+        return result.first() is not None
+
+    async def remove_many(
+        self, db: AsyncSession, *, ids: Sequence[Any], commit: bool = True
+    ) -> Sequence[ModelType]:
+        if not ids:
+            return []
+        result = await db.scalars(
+            delete(self.model)
+            .where(self.model.id.in_(ids))  # type: ignore[attr-defined]
+            .returning(self.model)
+        )
+        db_objs = result.all()
+        if commit:
+            await db.commit()
+        return db_objs
@@ -0,0 +1,134 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, delete, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.crud.base import CRUDBase
+from app.models.database import Blob, File
+from app.models.file import FileCreate, FileSort
+
+# Listing order -> its column; each has an index on (owner_id, column[, id]).
+# Ids increase with upload time, so they give the by-date order.
+SORT_COLUMNS: Dict[FileSort, ColumnElement[Any]] = {
+    FileSort.NAME: File.name,
+    FileSort.CREATED_AT: File.id,
+    FileSort.SIZE: File.size,
+}
+
+class CRUDFile(CRUDBase[File, FileCreate, BaseModel]):
+    """
+    Files and the reference counts of the blobs they name. The write methods
+    don't commit: the caller places or retires the blob on disk while the
+    transaction holds its row, then commits.
+    """
+
+    async def get_by_name(self, db: AsyncSession, *, owner_id: int, name: str) -> Optional[File]:
+        result = await db.execute(select(File).where(File.owner_id == owner_id, File.name == name))
+        return result.scalar_one_or_none()
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        sort: FileSort = FileSort.NAME,
+        descending: bool = False,
+        limit: int = 50,
+        after: Optional[Tuple[Any, int]] = None
+    ) -> Sequence[File]:
+        """
+        The owner's files in `sort` order (ties by id), starting after the
+        (sort value, id) position `after`: keyset pagination, so a page costs
+        the same however deep into the listing it is.
+        """
+        column = SORT_COLUMNS[sort]
+        query = select(File).where(File.owner_id == owner_id)
+        if after is not None:
+            position = tuple_(column, File.id)
+            bound = tuple_(*after)  # type: ignore[arg-type]
+            query = query.where(position < bound if descending else position > bound)
+        if descending:
+            query = query.order_by(column.desc(), File.id.desc())
+        else:
+            query = query.order_by(column, File.id)
+        result = await db.execute(query.limit(limit))
+        return result.scalars().all()
+
+    async def attach(self, db: AsyncSession, *, owner_id: int, obj_in: FileCreate) -> Optional[str]:
+        """
+        Point the owner's file `obj_in.name` at the blob `obj_in.sha256`, creating
+        either as needed and counting the reference. Returns the blob the file
+        pointed at before if that lost its last reference, else None.
+        """
+        # Upsert syntax is dialect specific; both flavours share the same API.
+        # The upsert also locks the blob row until the caller commits.
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(Blob).values(sha256=obj_in.sha256, size=obj_in.size, ref_count=1)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[Blob.sha256], set_={"ref_count": Blob.ref_count + 1}
+        ))
+
+        values = {"blob_sha256": obj_in.sha256, "size": obj_in.size, "content_type": obj_in.content_type}
+        stmt = dialect.insert(File).values(owner_id=owner_id, name=obj_in.name, **values)
+        result = await db.execute(stmt.on_conflict_do_nothing(index_elements=[File.owner_id, File.name]))
+        if result.rowcount == 1:  # type: ignore[attr-defined]
+            return None
+
+        # The name was taken: the upload replaces that file
+        previous = (await db.execute(
+            select(File.blob_sha256).where(File.owner_id == owner_id, File.name == obj_in.name).with_for_update()
+        )).scalar_one()
+        if previous != obj_in.sha256:
+            await db.execute(
+                update(File).where(File.owner_id == owner_id, File.name == obj_in.name).values(**values)
+            )
+        # Either the old blob loses this file's reference or, for the same
+        # contents again, the one just added is taken back
+        return previous if await self._release(db, sha256=previous) else None
+
+    async def add(self, db: AsyncSession, *, owner_id: int, obj_in: FileCreate) -> bool:
+        """
+        Record the owner's file `obj_in.name` unless the name is taken, counting
+        the blob reference. False, with nothing changed, if it was taken.
+        """
+        # Like attach: the blob row first (the file row references it), locked
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(Blob).values(sha256=obj_in.sha256, size=obj_in.size, ref_count=1)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[Blob.sha256], set_={"ref_count": Blob.ref_count + 1}
+        ))
+        stmt = dialect.insert(File).values(
+            owner_id=owner_id, name=obj_in.name, blob_sha256=obj_in.sha256,
+            size=obj_in.size, content_type=obj_in.content_type,
+        )
+        result = await db.execute(stmt.on_conflict_do_nothing(index_elements=[File.owner_id, File.name]))
+        if result.rowcount == 1:  # type: ignore[attr-defined]
+            return True
+        # Nothing is on disk for a blob row created just now, so dropping it is all there is to undo
+        await self._release(db, sha256=obj_in.sha256)
+        return False
+
+    async def detach(self, db: AsyncSession, *, owner_id: int, name: str) -> Tuple[bool, Optional[str]]:
+        """
+        Delete the owner's file `name`. Returns (deleted, orphan): whether it
+        existed, and its blob if that lost its last reference.
+        """
+        result = await db.execute(
+            delete(File).where(File.owner_id == owner_id, File.name == name).returning(File.blob_sha256)
+        )
+        sha256 = result.scalar_one_or_none()
+        if sha256 is None:
+            return False, None
+        return True, sha256 if await self._release(db, sha256=sha256) else None
+
+    async def _release(self, db: AsyncSession, *, sha256: str) -> bool:
+        # Drop one reference; the blob's row goes with its last. True if it went.
+        result = await db.execute(
+            update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count - 1).returning(Blob.ref_count)
+        )
+        if result.scalar_one() > 0:
+            return False
+        await db.execute(delete(Blob).where(Blob.sha256 == sha256, Blob.ref_count == 0))
+        return True
+
+file = CRUDFile(File)
@@ -1,10 +1,49 @@
-from typing import Optional, Sequence
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Row, Select, and_, case, column, func, literal, literal_column, or_, select, table
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.crud.base import CRUDBase
-from app.models.database import Task
+from app.models.database import Task, TaskCount
 from app.models.task import TaskCreate, TaskUpdate, TaskPriority, TaskStatus
 
+# (owner_id, status, priority) -> change in number of tasks
+CountDeltas = Counter[Tuple[int, TaskStatus, TaskPriority]]
+
+EXPORT_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.priority, Task.status,
+    Task.due_date, Task.created_at, Task.updated_at,
+)
+
+# Exactly the TaskResponse fields, in its field order. NULL status/priority
+# (rows written outside the ORM) read as the column defaults.
+LIST_COLUMNS = (
+    Task.title, Task.description,
+    func.coalesce(Task.priority, literal(TaskPriority.MEDIUM, Task.priority.type)).label("priority"),
+    Task.due_date, Task.id,
+    func.coalesce(Task.status, literal(TaskStatus.PENDING, Task.status.type)).label("status"),
+)
+
+# Dashboard statistics per (owner id, owner version). Any write to an owner's
+# tasks, by any process, moves the version on, so entries never go stale;
+# the TTL bounds how old overdue and due_soon (which move with the clock) get.
+stats_cache: TTLCache[Tuple[int, int], Dict[str, Any]] = TTLCache(
+    maxsize=settings.STATS_CACHE_MAXSIZE, ttl=settings.STATS_CACHE_TTL_SECONDS
+)
+
+# External-content FTS5 index over tasks (SQLite only), see models.database
+tasks_fts = table("tasks_fts", column("rowid"))
+
+def fts5_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word. Each word is quoted so
+    FTS5 operators and punctuation in user input are searched for literally.
+    """
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in q.split())
+
 class CRUDTask(CRUDBase[Task, TaskCreate, TaskUpdate]):
     async def get_tasks_by_owner(
         self,
@@ -14,27 +53,340 @@ class CRUDTask(CRUDBase[Task, TaskCreate, TaskUpdate]):
         skip: int = 0,
         limit: int = 100,
         priority: Optional[TaskPriority] = None,
-        status: Optional[TaskStatus] = None
+        status: Optional[TaskStatus] = None,
+        after_id: Optional[int] = None
     ) -> Sequence[Task]:
-        query = select(Task).where(Task.owner_id == owner_id)
+        query = self._owner_page_query(
+            select(Task), owner_id=owner_id, skip=skip, limit=limit,
+            priority=priority, status=status, after_id=after_id
+        )
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    async def get_task_rows_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        priority: Optional[TaskPriority] = None,
+        status: Optional[TaskStatus] = None,
+        after_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Same page as get_tasks_by_owner, as plain dicts of the TaskResponse fields.
+        Runs on the session's connection directly, so no ORM objects or identity
+        map entries are built for rows that are only going to be serialized.
+        """
+        query = self._owner_page_query(
+            select(*LIST_COLUMNS), owner_id=owner_id, skip=skip, limit=limit,
+            priority=priority, status=status, after_id=after_id
+        )
+        result = await (await db.connection()).execute(query)
+        return [row._asdict() for row in result]
+
+    def _owner_page_query(
+        self,
+        query: Select[Any],
+        *,
+        owner_id: int,
+        skip: int,
+        limit: int,
+        priority: Optional[TaskPriority],
+        status: Optional[TaskStatus],
+        after_id: Optional[int]
+    ) -> Select[Any]:
+        query = query.where(Task.owner_id == owner_id)
 
         if priority:
             query = query.where(Task.priority == priority)
         if status:
             query = query.where(Task.status == status)
 
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
+        # Keyset pagination: seek past the last id the client saw instead of
+        # making the database count off and discard `skip` rows.
+        if after_id is not None:
+            query = query.where(Task.id > after_id)
+        else:
+            query = query.offset(skip)
+
+        return query.order_by(Task.id).limit(limit)
+
+    async def search(
+        self, db: AsyncSession, *, owner_id: int, q: str, limit: int = 20
+    ) -> Sequence[Task]:
+        """Best matches for `q` among the owner's tasks, title hits ranked first."""
+        query = select(Task).where(Task.owner_id == owner_id)
+
+        if db.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery("english", q)
+            search_vector: ColumnElement[Any] = literal_column("tasks.search_vector")
+            query = query.where(search_vector.op("@@")(tsquery)).order_by(
+                func.ts_rank_cd(search_vector, tsquery).desc(), Task.id
+            )
+        else:
+            match = fts5_query(q)
+            if not match:
+                return []
+            # bm25 scores better matches lower; weights are per column (title, description)
+            query = (
+                query.join(tasks_fts, tasks_fts.c.rowid == Task.id)
+                .where(literal_column("tasks_fts").op("MATCH")(match))
+                .order_by(func.bm25(literal_column("tasks_fts"), 10.0, 1.0), Task.id)
+            )
+
+        result = await db.execute(query.limit(limit))
+        return result.scalars().all()
+
+    async def stream_by_owner(
+        self, db: AsyncSession, *, owner_id: int, batch_size: int = 1000
+    ) -> AsyncIterator[Row[Any]]:
+        # Plain column rows from a server-side cursor: no ORM instances and
+        # no more than batch_size rows buffered at a time.
+        result = await db.stream(
+            select(*EXPORT_COLUMNS)
+            .where(Task.owner_id == owner_id)
+            .order_by(Task.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row
+
+    async def get_counts(self, db: AsyncSession, *, owner_id: int) -> Sequence[TaskCount]:
+        # At most len(TaskStatus) * len(TaskPriority) rows per owner, whatever the
+        # task count. Rows whose count dropped to 0 are kept for their version.
+        result = await db.execute(select(TaskCount).where(TaskCount.owner_id == owner_id))
         return result.scalars().all()
 
+    async def get_cache_validators(self, db: AsyncSession, *, id: int) -> Optional[Row[Any]]:
+        """
+        (owner_id, updated_at, owner_version) for one task, or None if it does not
+        exist: enough to answer a conditional GET without loading the task.
+        """
+        owner_version = (
+            select(func.coalesce(func.sum(TaskCount.version), 0))
+            .where(TaskCount.owner_id == Task.owner_id)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(Task.owner_id, Task.updated_at, owner_version.label("owner_version")).where(Task.id == id)
+        )
+        return result.first()
+
+    async def get_stats(self, db: AsyncSession, *, owner_id: int) -> Dict[str, Any]:
+        # Read before the stats themselves, so a write committing in between
+        # can only make the cached numbers newer than their key, never older
+        version = (await db.execute(
+            select(func.coalesce(func.sum(TaskCount.version), 0)).where(TaskCount.owner_id == owner_id)
+        )).scalar_one()
+        key = (owner_id, int(version))
+        stats = stats_cache.get(key)
+        if stats is not None:
+            return stats
+
+        now = datetime.now(timezone.utc)
+        due_soon_hours = settings.STATS_DUE_SOON_HOURS
+        is_open = or_(
+            Task.status.is_(None), Task.status.notin_([TaskStatus.COMPLETED, TaskStatus.CANCELLED])
+        )
+        overdue = case((and_(is_open, Task.due_date < now), 1), else_=0)
+        due_soon = case(
+            (and_(is_open, Task.due_date >= now, Task.due_date < now + timedelta(hours=due_soon_hours)), 1),
+            else_=0,
+        )
+        # One pass over the owner's tasks, at most len(TaskStatus) * len(TaskPriority) groups
+        result = await db.execute(
+            select(Task.status, Task.priority, func.count(), func.sum(overdue), func.sum(due_soon))
+            .where(Task.owner_id == owner_id)
+            .group_by(Task.status, Task.priority)
+        )
+
+        by_status: Counter[TaskStatus] = Counter()
+        by_priority: Counter[TaskPriority] = Counter()
+        stats = {"total": 0, "overdue": 0, "due_soon": 0}
+        for status, priority, count, overdue_count, due_soon_count in result.all():
+            by_status[status or TaskStatus.PENDING] += count
+            by_priority[priority or TaskPriority.MEDIUM] += count
+            stats["total"] += count
+            stats["overdue"] += overdue_count or 0
+            stats["due_soon"] += due_soon_count or 0
+
+        stats.update(
+            by_status=dict(by_status),
+            by_priority=dict(by_priority),
+            due_soon_hours=due_soon_hours,
+            computed_at=now,
+        )
+        stats_cache.set(key, stats)
+        return stats
+
     async def create_with_owner(
         self, db: AsyncSession, *, obj_in: TaskCreate, owner_id: int
     ) -> Task:
         obj_in_data = obj_in.model_dump()
         db_obj = Task(**obj_in_data, owner_id=owner_id)
         db.add(db_obj)
+        # Flush first so column defaults (status) are applied before counting
+        await db.flush()
+        await self._apply_counts(db, self._deltas(added=[db_obj]))
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def create_many_with_owner(
+        self, db: AsyncSession, *, objs_in: Sequence[TaskCreate], owner_id: int
+    ) -> Sequence[Task]:
+        db_objs = await self.create_many(
+            db, objs_in=[{**obj_in.model_dump(), "owner_id": owner_id} for obj_in in objs_in], commit=False
+        )
+        await self._apply_counts(db, self._deltas(added=db_objs))
+        await db.commit()
+        return db_objs
+
+    async def get_owner_ids(self, db: AsyncSession, *, ids: Sequence[int]) -> Dict[int, int]:
+        # Maps each existing task id to its owner in one query; missing ids are absent
+        if not ids:
+            return {}
+        result = await db.execute(select(Task.id, Task.owner_id).where(Task.id.in_(ids)))
+        return {task_id: owner_id for task_id, owner_id in result.all()}
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: Task,
+        obj_in: Union[TaskUpdate, Dict[str, Any]]
+    ) -> Task:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+
+        deltas = self._deltas(removed=[db_obj])
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        deltas.update(self._deltas(added=[db_obj]))
+
+        db.add(db_obj)
+        await db.flush()
+        await self._apply_counts(db, deltas)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
 
+    async def update_returning(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        obj_in: Union[TaskUpdate, Dict[str, Any]],
+        owner_id: Optional[Any] = None,
+        commit: bool = True
+    ) -> Tuple[Optional[Task], bool]:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+
+        # RETURNING only yields the new row, so read the old status/priority
+        # (locking the row) when the update moves the task between counters.
+        old = None
+        if "status" in update_data or "priority" in update_data:
+            query = select(Task.owner_id, Task.status, Task.priority).where(Task.id == id)
+            if owner_id is not None:
+                query = query.where(Task.owner_id == owner_id)
+            old = (await db.execute(query.with_for_update())).first()
+
+        db_obj, exists = await super().update_returning(
+            db, id=id, obj_in=update_data, owner_id=owner_id, commit=False
+        )
+        if db_obj is not None:
+            # Without a status/priority change the task stays in its group, whose
+            # version still has to move
+            deltas = self._deltas(removed=[old or db_obj], added=[db_obj])
+            await self._apply_counts(db, deltas)
+        if commit:
+            await db.commit()
+        return db_obj, exists
+
+    async def update_many(
+        self, db: AsyncSession, *, objs_in: Sequence[Dict[str, Any]], commit: bool = True
+    ) -> Sequence[Task]:
+        moved = [obj["id"] for obj in objs_in if "status" in obj or "priority" in obj]
+        old_rows: Sequence[Any] = []
+        if moved:
+            result = await db.execute(
+                select(Task.owner_id, Task.status, Task.priority)
+                .where(Task.id.in_(moved))
+                .with_for_update()
+            )
+            old_rows = result.all()
+
+        db_objs = await super().update_many(db, objs_in=objs_in, commit=False)
+        moved_ids = set(moved)
+        unmoved = [obj for obj in db_objs if obj.id not in moved_ids]
+        deltas = self._deltas(removed=[*old_rows, *unmoved], added=db_objs)
+        await self._apply_counts(db, deltas)
+        if commit:
+            await db.commit()
+        return db_objs
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Task | None:
+        db_obj, _ = await self.delete_returning(db, id=id)
+        return db_obj
+
+    async def delete_returning(
+        self, db: AsyncSession, *, id: Any, owner_id: Optional[Any] = None, commit: bool = True
+    ) -> Tuple[Optional[Task], bool]:
+        db_obj, exists = await super().delete_returning(db, id=id, owner_id=owner_id, commit=False)
+        if db_obj is not None:
+            await self._apply_counts(db, self._deltas(removed=[db_obj]))
+        if commit:
+            await db.commit()
+        return db_obj, exists
+
+    async def remove_many(
+        self, db: AsyncSession, *, ids: Sequence[Any], commit: bool = True
+    ) -> Sequence[Task]:
+        db_objs = await super().remove_many(db, ids=ids, commit=False)
+        await self._apply_counts(db, self._deltas(removed=db_objs))
+        if commit:
+            await db.commit()
+        return db_objs
+
+    def _deltas(self, *, added: Sequence[Any] = (), removed: Sequence[Any] = ()) -> CountDeltas:
+        # Accepts Task objects or (owner_id, status, priority) rows. Rows written
+        # with a NULL status/priority are counted under the column defaults.
+        deltas: CountDeltas = Counter()
+        for sign, tasks in ((1, added), (-1, removed)):
+            for t in tasks:
+                key = (int(t.owner_id), t.status or TaskStatus.PENDING, t.priority or TaskPriority.MEDIUM)
+                deltas[key] += sign
+        return deltas
+
+    async def _apply_counts(self, db: AsyncSession, deltas: CountDeltas) -> None:
+        # Zero deltas are kept: the group was written, so its version moves.
+        # Each upserted row stays locked until commit (on PostgreSQL), so rows
+        # are written in one global order: a task moved pending -> completed
+        # while another moves completed -> pending would otherwise lock the two
+        # rows in opposite orders and deadlock.
+        rows = [
+            {"owner_id": owner_id, "status": status, "priority": priority, "count": delta, "version": 1}
+            for (owner_id, status, priority), delta in sorted(
+                deltas.items(), key=lambda item: (item[0][0], item[0][1].value, item[0][2].value)
+            )
+        ]
+        if not rows:
+            return
+
+        # Upsert syntax is dialect specific; both flavours share the same API
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(TaskCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TaskCount.owner_id, TaskCount.status, TaskCount.priority],
+            set_={"count": TaskCount.count + stmt.excluded["count"], "version": TaskCount.version + 1},
+        )
+        await db.execute(stmt, rows)
+
 task = CRUDTask(Task)
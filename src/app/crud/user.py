@@ -1,10 +1,20 @@
-from typing import Optional
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.crud.base import CRUDBase
 from app.models.database import User
 from app.models.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import release_connection
+from app.core.security import password_executor
+
+# Column values of recently authenticated users, keyed by username (the token subject)
+user_cache: TTLCache[str, Dict[str, Any]] = TTLCache(
+    maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+USER_COLUMNS = tuple(User.__table__.columns.keys())
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
@@ -15,29 +25,104 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         result = await db.execute(select(User).where(User.username == username))
         return result.scalar_one_or_none()
 
+    async def get_by_username_cached(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        # Hits return a fresh, session-less User built from the cached column
+        # values, so requests never share one mutable ORM instance.
+        values = user_cache.get(username)
+        if values is not None:
+            return User(**values)
+
+        user = await self.get_by_username(db, username=username)
+        if user is not None:
+            user_cache.set(username, {column: getattr(user, column) for column in USER_COLUMNS})
+        return user
+
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        # Hash before touching the session: connections earlier reads checked
+        # out go back to the pool rather than waiting on bcrypt
+        await release_connection(db)
+        hashed_password = await password_executor.hash(obj_in.password)
         db_obj = User(
             email=obj_in.email,
             username=obj_in.username,
             full_name=obj_in.full_name,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password,
         )
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
 
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        user = await super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self._invalidate([user])
+        return user
+
+    async def update_returning(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        obj_in: Union[UserUpdate, Dict[str, Any]],
+        owner_id: Optional[Any] = None,
+        commit: bool = True
+    ) -> Tuple[Optional[User], bool]:
+        user, exists = await super().update_returning(
+            db, id=id, obj_in=obj_in, owner_id=owner_id, commit=commit
+        )
+        self._invalidate([user])
+        return user, exists
+
+    async def update_many(
+        self, db: AsyncSession, *, objs_in: Sequence[Dict[str, Any]], commit: bool = True
+    ) -> Sequence[User]:
+        users = await super().update_many(db, objs_in=objs_in, commit=commit)
+        self._invalidate(users)
+        return users
+
+    async def remove(self, db: AsyncSession, *, id: int) -> User | None:
+        user = await super().remove(db, id=id)
+        self._invalidate([user])
+        return user
+
+    async def delete_returning(
+        self, db: AsyncSession, *, id: Any, owner_id: Optional[Any] = None, commit: bool = True
+    ) -> Tuple[Optional[User], bool]:
+        user, exists = await super().delete_returning(db, id=id, owner_id=owner_id, commit=commit)
+        self._invalidate([user])
+        return user, exists
+
+    async def remove_many(
+        self, db: AsyncSession, *, ids: Sequence[Any], commit: bool = True
+    ) -> Sequence[User]:
+        users = await super().remove_many(db, ids=ids, commit=commit)
+        self._invalidate(users)
+        return users
+
     async def authenticate(
         self, db: AsyncSession, *, username: str, password: str
     ) -> Optional[User]:
         user = await self.get_by_username(db, username=username)
+        # bcrypt takes far longer than the lookup; don't hold a pooled connection through it
+        await release_connection(db)
         if not user:
             return None
-        if not verify_password(password, str(user.hashed_password)):
+        if not await password_executor.verify(password, str(user.hashed_password)):
             return None
         return user
 
     def is_active(self, user: User) -> bool:
         return bool(user.is_active)
 
+    def _invalidate(self, users: Sequence[Optional[User]]) -> None:
+        for user in users:
+            if user is not None:
+                user_cache.pop(str(user.username))
+
 user = CRUDUser(User)
@@ -1,17 +1,18 @@
+"""
+    Application factory. Importing this module defines things and nothing more:
+    the routers (and the CRUD, model and security modules behind them) are
+    imported when an app is built, and the database engines are created by the
+    app's lifespan, inside the worker process that will use them.
+
+        uvicorn app.main:create_app --factory
+"""
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 from fastapi import FastAPI,  HTTPException, status
-from app.routers import tasks, auth, files
 from pydantic import BaseModel
 
+from app.core.config import settings
 
-task_app = FastAPI(
-    title="Task Management API",
-    description="A simple Task Management API built with FastAPI",
-    version="1.0.0",
-)
-
-task_app.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
-task_app.include_router(auth.router, prefix="/auth", tags=["auth"])
-task_app.include_router(files.router, tags=["files"])
 
 class RootResponse(BaseModel):
     message: str
@@ -19,13 +20,6 @@ class RootResponse(BaseModel):
 class ErrorResponse(BaseModel):
     detail: str
 
-@task_app.get(
-    "/",
-    response_model=RootResponse,
-    responses={500: {"model": ErrorResponse, "description": "Internal Server Error"},
-               200: {"model": RootResponse, "description": "Successful Response", "name": "govind"}},
-    tags=["root"],
-)
 def read_root() -> RootResponse:
     try:
         return RootResponse(message="Welcome to the Task Management API!")
@@ -33,6 +27,66 @@ def read_root() -> RootResponse:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def create_app() -> FastAPI:
+    """
+    Build the API. It is configured by app.core.config.settings, read from the
+    environment at import: routes, caches and limiters are sized from it as
+    their modules load, so there is no per-app Settings to pass in.
+    """
+    from app.core import database
+    from app.core.admission import AdmissionMiddleware
+    from app.core.metrics import MetricsMiddleware, TimedRoute
+    from app.core.security import password_executor
+    from app.routers import tasks, auth, files, internal
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Engines are created per worker, after any fork: pooled connections
+        # must never be shared between processes
+        database.init_engine(settings)
+        await database.warm_pool(settings.DB_POOL_WARMUP)
+        yield
+        # Let in-flight password hashes finish and release the pool's workers
+        password_executor.shutdown()
+        await database.dispose_engine()
+
+    app = FastAPI(
+        title="Task Management API",
+        description="A simple Task Management API built with FastAPI",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    # Routes declared on the app itself (e.g. "/") report serialize time too
+    app.router.route_class = TimedRoute
+    app.add_middleware(AdmissionMiddleware)
+    # Added last, so it wraps admission control: refused requests are measured too
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
+    app.include_router(auth.router, prefix="/auth", tags=["auth"])
+    app.include_router(files.router, tags=["files"])
+    app.include_router(internal.router, prefix="/internal", tags=["internal"], include_in_schema=False)
+    app.include_router(internal.metrics_router, include_in_schema=False)
+
+    app.get(
+        "/",
+        response_model=RootResponse,
+        responses={500: {"model": ErrorResponse, "description": "Internal Server Error"},
+                   200: {"model": RootResponse, "description": "Successful Response", "name": "govind"}},
+        tags=["root"],
+    )(read_root)
+    return app
+
+
+def __getattr__(name: str) -> Any:
+    # `app.main:task_app` (tests, benchmarks, plain `uvicorn app.main:task_app`)
+    # is built on first access and then reused
+    if name == "task_app":
+        app = globals()["task_app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # if __name__ == "__main__":
 #     import uvicorn
-#     uvicorn.run(task_app, host="0.0.0.0", port=8000)
+#     uvicorn.run(create_app(), host="0.0.0.0", port=8000)
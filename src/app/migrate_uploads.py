@@ -0,0 +1,209 @@
+"""
+    `migrate-uploads` (or `python -m app.migrate_uploads`) moves uploaded files
+    stored in older layouts into the current one (see app/core/storage.py),
+    while the service keeps running:
+
+    - blobs not at their path for the configured UPLOAD_SHARD_DEPTH (stored
+      before sharding, or before the depth changed) are moved there;
+    - files uploaded before content-addressed storage, <owner_id>_<name> in
+      the upload directory, are hashed, recorded in the blobs and files tables
+      and moved into the blob store, like new uploads.
+
+    It works in batches, pausing between them to leave disk and database time
+    to the service. The filesystem is the progress record: whatever is still in
+    an old layout is what remains, so an interrupted run (stopped at any point)
+    is resumed by running it again. Once a run finds nothing left to move, set
+    UPLOAD_LEGACY_LAYOUT=false.
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.core import database, storage
+from app.core.config import settings
+from app.crud.file import file as crud_file
+from app.models.database import User
+from app.models.file import FileCreate
+
+logger = logging.getLogger(__name__)
+
+SHA256_NAME = re.compile(r"[0-9a-f]{64}")
+LEGACY_NAME = re.compile(r"(\d+)_(.+)", re.DOTALL)
+
+
+@dataclass
+class LegacyFile:
+    path: str
+    owner_id: int
+    name: str
+    sha256: str = ""
+    size: int = 0
+
+
+def misplaced_blobs(upload_dir: str) -> Iterator[Tuple[str, str]]:
+    """(current path, configured path) of each blob not where the configured layout puts it."""
+    for root, _, names in os.walk(os.path.join(upload_dir, storage.BLOB_DIR)):
+        for name in names:
+            path = os.path.join(root, name)
+            # Skips blobs being deleted (<sha256>.<token>.deleted)
+            if SHA256_NAME.fullmatch(name) and path != (target := storage.blob_path(upload_dir, name)):
+                yield path, target
+
+
+def legacy_files(upload_dir: str) -> Iterator[LegacyFile]:
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            # Hidden files are uploads in progress
+            match = LEGACY_NAME.fullmatch(entry.name)
+            if match and not entry.name.startswith(".") and entry.is_file(follow_symlinks=False):
+                yield LegacyFile(path=entry.path, owner_id=int(match.group(1)), name=match.group(2))
+
+
+def batches(items: Iterator, size: int) -> Iterator[list]:  # type: ignore[type-arg]
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def hash_file(path: str, chunk_size: int) -> Tuple[str, int]:
+    digest, size = hashlib.sha256(), 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+async def move_blobs(upload_dir: str, batch_size: int, pause: float, dry_run: bool) -> int:
+    moved = 0
+    for batch in batches(misplaced_blobs(upload_dir), batch_size):
+        if dry_run:
+            moved += len(batch)
+            continue
+        # Linked at the new path first and unlinked at the old one after a pause:
+        # the blob is always at one of them, and a request that found it at the
+        # old path has opened it by then (storage.find_blob)
+        for path, target in batch:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(path, target)
+            except FileExistsError:
+                pass  # the same contents, stored there by an upload meanwhile
+            except FileNotFoundError:
+                continue  # deleted meanwhile
+        await asyncio.sleep(pause)
+        for path, _ in batch:
+            storage.remove(path)
+        moved += len(batch)
+        logger.info("Moved %d blobs", moved)
+    return moved
+
+
+async def import_batch(upload_dir: str, batch: List[LegacyFile]) -> Tuple[int, int]:
+    """Record a batch of old-layout files; returns (imported, skipped)."""
+    async with database.AsyncSessionLocal() as db:
+        owners: Set[int] = set((await db.execute(
+            select(User.id).where(User.id.in_({f.owner_id for f in batch}))
+        )).scalars())
+        skipped = [f for f in batch if f.owner_id not in owners or len(f.name) > 255]
+        for f in skipped:
+            logger.warning("Skipping %s: unknown owner or name too long", f.path)
+        batch = [f for f in batch if f not in skipped]
+
+        # Hashing reads every file: done before the transaction, off the event loop
+        for f in batch:
+            f.sha256, f.size = await asyncio.to_thread(hash_file, f.path, settings.UPLOAD_CHUNK_BYTES)
+
+        recorded: List[LegacyFile] = []
+        for f in batch:
+            obj_in = FileCreate(
+                name=f.name, sha256=f.sha256, size=f.size,
+                content_type=mimetypes.guess_type(f.name)[0] or "application/octet-stream",
+            )
+            savepoint = await db.begin_nested()
+            # A name recorded since (a newer upload) wins over the old copy
+            if not await crud_file.add(db, owner_id=f.owner_id, obj_in=obj_in):
+                await savepoint.commit()
+                continue
+            # Linked, not moved, so the file stays reachable at its old path
+            # until the transaction commits; the blob row is locked meanwhile
+            if storage.find_blob(upload_dir, f.sha256) is None:
+                target = storage.blob_path(upload_dir, f.sha256)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(f.path, target)
+                except FileNotFoundError:
+                    # Deleted by its owner meanwhile: undo just this file
+                    await savepoint.rollback()
+                    continue
+            await savepoint.commit()
+            recorded.append(f)
+        await db.commit()
+
+    for f in batch:
+        # Recorded, or superseded by a newer upload: the old copy goes either way
+        storage.remove(f.path)
+    return len(recorded), len(skipped)
+
+
+async def import_legacy_files(upload_dir: str, batch_size: int, pause: float, dry_run: bool) -> Tuple[int, int]:
+    imported = skipped = 0
+    for batch in batches(legacy_files(upload_dir), batch_size):
+        if dry_run:
+            imported += len(batch)
+            continue
+        done, passed = await import_batch(upload_dir, batch)
+        imported, skipped = imported + done, skipped + passed
+        logger.info("Imported %d files (%d skipped)", imported, skipped)
+        await asyncio.sleep(pause)
+    return imported, skipped
+
+
+async def migrate(upload_dir: str, batch_size: int, pause: float, dry_run: bool) -> int:
+    """Returns the number of files left in an old layout (skipped, or all of them with dry_run)."""
+    moved = await move_blobs(upload_dir, batch_size, pause, dry_run)
+    imported, skipped = await import_legacy_files(upload_dir, batch_size, pause, dry_run)
+    verb = "To move" if dry_run else "Moved"
+    logger.info("%s: %d blobs, %d old-layout files; %d skipped", verb, moved, imported, skipped)
+    return moved + imported + skipped if dry_run else skipped
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upload-dir", default=settings.UPLOAD_DIR)
+    parser.add_argument("--batch-size", type=int, default=200, help="files per batch (and per transaction)")
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds to wait between batches")
+    parser.add_argument("--dry-run", action="store_true", help="count what would move, changing nothing")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    async def run() -> int:
+        try:
+            return await migrate(args.upload_dir, args.batch_size, args.pause, args.dry_run)
+        finally:
+            await database.dispose_engine()
+
+    left = asyncio.run(run())
+    # Non-zero while anything is left in an old layout, so scripts can tell when it's done
+    raise SystemExit(1 if left else 0)
+
+
+if __name__ == "__main__":
+    main()
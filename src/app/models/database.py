@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import DDL, BigInteger, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -37,3 +37,114 @@ class Task(Base):
 
     # Relationship
     owner = relationship("User", back_populates="tasks")
+
+    __table_args__ = (
+        # Keyset pagination on id over all of an owner's tasks: seeks straight
+        # to the page instead of sorting every row the owner has
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        # The same with both listing filters pinned
+        Index("ix_tasks_owner_status_priority_id", "owner_id", "status", "priority", "id"),
+    )
+
+# Full-text search over task titles and descriptions, ranked with titles weighted
+# above descriptions. The index lives outside the mapped columns because each
+# dialect needs a different structure: a generated tsvector column with a GIN
+# index on PostgreSQL, an external-content FTS5 table kept in step by triggers
+# on SQLite. Alembic revision 3e8f5c7a9d12 adds the PostgreSQL objects.
+TASK_SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in TASK_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+# The triggers go with the tasks table; the FTS5 table has to be dropped explicitly
+event.listen(
+    Task.__table__, "after_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite")
+)
+
+class TaskCount(Base):
+    """
+    Number of tasks per owner, status and priority, kept in step by CRUDTask writes.
+    `version` goes up with every write to a task in the group, so the sum over an
+    owner's rows changes whenever any of their tasks does.
+    """
+    __tablename__ = "task_counts"
+
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(TaskStatus, native_enum=False, length=20), primary_key=True)  # type: ignore[var-annotated]
+    priority = Column(Enum(TaskPriority, native_enum=False, length=20), primary_key=True)  # type: ignore[var-annotated]
+    count = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+class Blob(Base):
+    """
+    The contents of uploaded files, stored once however many files share them,
+    at a path derived from their SHA-256 (see app.core.storage). `ref_count` is
+    the number of files rows naming the blob; the row and its file on disk go
+    when it drops to zero.
+    """
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class File(Base):
+    """
+    A file a user uploaded: a name, unique per owner, for a blob, plus the
+    metadata listings show, so they never touch the filesystem.
+    """
+    __tablename__ = "files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(255), nullable=False)
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100), nullable=False, server_default="application/octet-stream")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # One per listing order, each starting with the owner, so a page costs
+        # the same however many files other users have. Ids increase with upload
+        # time, so (owner_id, id) serves the by-date order.
+        Index("ix_files_owner_id_name", "owner_id", "name", unique=True),
+        Index("ix_files_owner_id_id", "owner_id", "id"),
+        Index("ix_files_owner_id_size_id", "owner_id", "size", "id"),
+    )
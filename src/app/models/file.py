@@ -0,0 +1,30 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+class FileSort(str, Enum):
+    NAME = "name"
+    CREATED_AT = "created_at"
+    SIZE = "size"
+
+class FileCreate(BaseModel):
+    """A received upload, to be recorded under its owner's chosen name"""
+    name: str = Field(..., max_length=255)
+    sha256: str = Field(..., min_length=64, max_length=64)
+    size: int = Field(..., ge=0)
+    content_type: str = Field(..., max_length=100)
+
+class FileInfo(BaseModel):
+    """Model for one file in a listing"""
+    name: str
+    size: int
+    content_type: str
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class FileListResponse(BaseModel):
+    """Model for paginated file list response"""
+    files: List[FileInfo]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page")
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import Dict, Optional, List, TypedDict
 from enum import Enum
 from datetime import datetime
 
@@ -43,6 +43,66 @@ class TaskResponse(TaskBase):
 class TaskListResponse(BaseModel):
     """Model for paginated task list response"""
     tasks: List[TaskResponse]
+    total: int = Field(..., description="Number of tasks matching the filters")
+    page: int
+    per_page: int
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page")
+    by_status: Dict[TaskStatus, int] = Field(default_factory=dict, description="All of the owner's tasks per status")
+    by_priority: Dict[TaskPriority, int] = Field(default_factory=dict, description="All of the owner's tasks per priority")
+
+class TaskStats(BaseModel):
+    """Model for the per-owner task statistics shown on dashboards"""
+    total: int
+    by_status: Dict[TaskStatus, int]
+    by_priority: Dict[TaskPriority, int]
+    overdue: int = Field(..., description="Open tasks whose due date has passed")
+    due_soon: int = Field(..., description="Open tasks due within the next `due_soon_hours`")
+    due_soon_hours: int
+    computed_at: datetime
+
+class TaskRow(TypedDict):
+    """One TaskResponse as a plain dict, in the same field order"""
+    title: str
+    description: Optional[str]
+    priority: TaskPriority
+    due_date: Optional[datetime]
+    id: int
+    status: TaskStatus
+
+class TaskListPage(TypedDict):
+    """TaskListResponse as plain dicts, for the GET /tasks/ fast path"""
+    tasks: List[TaskRow]
     total: int
     page: int
     per_page: int
+    next_cursor: Optional[str]
+    by_status: Dict[TaskStatus, int]
+    by_priority: Dict[TaskPriority, int]
+
+# Built once at import: dump_json writes a TaskListPage straight to JSON bytes,
+# without validating it or building any model instances
+task_list_page_adapter = TypeAdapter(TaskListPage)
+
+class TaskBulkUpdate(TaskUpdate):
+    """Model for one item of a bulk update - the task id plus the fields to change"""
+    id: int
+
+class TaskBulkDelete(BaseModel):
+    """Model for a bulk delete request"""
+    ids: List[int] = Field(..., description="IDs of the tasks to delete")
+
+class BulkItemError(BaseModel):
+    """Model for a bulk item that could not be applied"""
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[int] = None
+    detail: str
+
+class TaskBulkResponse(BaseModel):
+    """Model for bulk create/update responses"""
+    tasks: List[TaskResponse]
+    errors: List[BulkItemError]
+
+class TaskBulkDeleteResponse(BaseModel):
+    """Model for bulk delete responses"""
+    deleted: List[int]
+    errors: List[BulkItemError]
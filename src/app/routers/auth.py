@@ -7,12 +7,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.core import security
 from app.core.config import settings
+from app.core.metrics import TimedRoute
 from app.crud.user import user as crud_user
 from app.models.user import UserCreate, UserResponse, UserLogin
 from app.models.database import User
 
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/login")
 async def login(
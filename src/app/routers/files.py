@@ -1,127 +1,224 @@
 
+import mimetypes
 import os
-import aiofiles
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+import stat
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import storage
+from app.core.config import settings
+from app.core.database import release_connection
+from app.core.downloads import RangeFileResponse
+from app.core.exceptions import ValidationError
+from app.core.metrics import TimedRoute
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.uploads import receive_file
+from app.crud.file import file as crud_file
 from app.models.database import User
+from app.models.file import FileCreate, FileInfo, FileListResponse, FileSort
 from app.api import deps
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-UPLOAD_DIR = "uploads"
+UPLOAD_DIR = settings.UPLOAD_DIR
 ALLOWED_EXTENSIONS = {".txt", ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".doc", ".docx"}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-
-# Create upload directory if it do  esn't exist
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+MAX_FILE_SIZE = settings.UPLOAD_MAX_BYTES
 
 def allowed_file(filename: str) -> bool:
     return any(filename.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
 
+def check_filename(filename: str) -> None:
+    if len(filename) > 255:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File name is too long")
+    if not allowed_file(filename):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}")
 
 
-@router.post("/upload")
+# The body is read by hand (see app.core.uploads) rather than through
+# `UploadFile = File(...)`, which receives the whole file before the endpoint
+# runs; this documents the form that FastAPI no longer derives
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+}
+
+@router.post("/upload", openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_file(
-    file: UploadFile = File(...),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> dict[str, str | int]:
     """ Upload File """
+    # The user is authenticated before any of the body is read
+    upload = await receive_file(
+        request,
+        directory=UPLOAD_DIR,
+        max_bytes=MAX_FILE_SIZE,
+        chunk_size=settings.UPLOAD_CHUNK_BYTES,
+        check_filename=check_filename,
+    )
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    retired: List[Tuple[str, str]] = []
+    try:
+        orphan = await crud_file.attach(
+            db, owner_id=owner_id, obj_in=FileCreate(
+                name=upload.filename, sha256=upload.sha256, size=upload.size,
+                # From the (allowed) extension rather than the client's part header
+                content_type=mimetypes.guess_type(upload.filename)[0] or "application/octet-stream",
+            )
+        )
+        # Stored once per distinct content: a duplicate only adds a reference.
+        # Both moves happen while the transaction holds the blob rows.
+        storage.store_blob(UPLOAD_DIR, upload.path, upload.sha256)
+        if orphan is not None:
+            retired = storage.retire_blob(UPLOAD_DIR, orphan)
+        await db.commit()
+    except BaseException:
+        storage.restore_blob(retired)
+        storage.remove(upload.path)
+        raise
+    storage.purge(retired)
+    if settings.UPLOAD_LEGACY_LAYOUT:
+        # Supersedes any copy of the file stored under the old flat layout
+        storage.remove(storage.legacy_path(UPLOAD_DIR, owner_id, upload.filename))
 
-    if not file or not file.filename or file.filename == "":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file uploaded")
-
-    if not allowed_file(file.filename):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}")
-    
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File size exceeds the maximum limit of {} bytes".format(MAX_FILE_SIZE))
-    
-    file_path = os.path.join(UPLOAD_DIR, f"{current_user.id}_{file.filename}")
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(content)
-    
     return {
-        "filename": file.filename,
-        "file_path": file_path,
+        "filename": upload.filename,
+        "file_path": storage.blob_path(UPLOAD_DIR, upload.sha256),
         "message": "File uploaded successfully",
-        "file_size": len(content)
+        "file_size": upload.size
     }
 
-@router.get("/download/{filename}")
+@router.get("/download/{filename}", response_class=RangeFileResponse)
 async def download_file(
     filename: str,
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: User = Depends(deps.get_current_active_user)
-) -> FileResponse:
+) -> RangeFileResponse:
     """
     Download a file uploaded by the current user.
-    Returns the actual file for download.
+    Returns the actual file for download; supports Range requests, so
+    interrupted downloads can resume and viewers can seek.
     """
-    # Construct the file path with user ID prefix
-    file_path = os.path.join(UPLOAD_DIR, f"{int(current_user.id)}_{filename}")  # type: ignore[arg-type]
-
-    # Check if file exists
-    if not os.path.exists(file_path):
+    # Looked up by owner, so other users' files are never found
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    record = await crud_file.get_by_name(db, owner_id=owner_id, name=filename)
+    await release_connection(db)
+    if record is not None:
+        file_path = storage.find_blob(UPLOAD_DIR, record.blob_sha256)  # type: ignore[arg-type]
+        # The contents' hash: the strongest validator there is, and shared by
+        # every copy of the same contents
+        headers = {"etag": f'"{record.blob_sha256}"'}
+    elif settings.UPLOAD_LEGACY_LAYOUT:
+        file_path, headers = storage.legacy_path(UPLOAD_DIR, owner_id, filename), {}
+    else:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
+            status_code=status.HTTP_404_NOT_FOUND,
             detail=f"File '{filename}' not found"
         )
-    
-    # Check if the file belongs to the current user (security check)
-    if not os.path.basename(file_path).startswith(f"{int(current_user.id)}_"):  # type: ignore[arg-type]
+
+    # Check if file exists; the stat is reused for the ETag and Content-Length
+    try:
+        stat_result = os.stat(file_path) if file_path is not None else None
+    except FileNotFoundError:
+        stat_result = None
+    if file_path is None or stat_result is None or not stat.S_ISREG(stat_result.st_mode):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this file"
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"File '{filename}' not found"
         )
     
     # Return the file as a downloadable response
-    return FileResponse(
+    return RangeFileResponse(
         path=file_path,
         filename=filename,  # Name to use when downloading
-        media_type="application/octet-stream"  # Generic binary file type
+        media_type="application/octet-stream",  # Generic binary file type
+        headers=headers,
+        stat_result=stat_result,
     )
 
 @router.delete("/delete/{filename}")
 async def delete_file(
     filename: str,
+    db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> dict[str, str]:
     """
     Delete a file uploaded by the current user.
+    The stored contents go with the last file referencing them.
     """
-    # Construct the file path with user ID prefix
-    file_path = os.path.join(UPLOAD_DIR, f"{int(current_user.id)}_{filename}")  # type: ignore[arg-type]
-
-    # Check if file exists
-    if not os.path.exists(file_path):
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    retired: List[Tuple[str, str]] = []
+    try:
+        deleted, orphan = await crud_file.detach(db, owner_id=owner_id, name=filename)
+        if orphan is not None:
+            retired = storage.retire_blob(UPLOAD_DIR, orphan)
+        await db.commit()
+    except BaseException:
+        storage.restore_blob(retired)
+        raise
+    storage.purge(retired)
+
+    if not deleted and settings.UPLOAD_LEGACY_LAYOUT:
+        # Not recorded: possibly stored under the old flat layout
+        try:
+            os.remove(storage.legacy_path(UPLOAD_DIR, owner_id, filename))
+            deleted = True
+        except FileNotFoundError:
+            pass
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"File '{filename}' not found"
         )
     
-    # Security check: ensure file belongs to current user
-    if not os.path.basename(file_path).startswith(f"{int(current_user.id)}_"):  # type: ignore[arg-type]
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to delete this file"
-        )
-    
-    # Delete the file
-    os.remove(file_path)
-    
     return {
         "message": f"File '{filename}' deleted successfully"
     }
 
-@router.get("/files")
+@router.get("/files", response_model=FileListResponse)
 async def list_user_files(
+    db: AsyncSession = Depends(deps.get_read_db),
+    sort: FileSort = FileSort.NAME,
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Opaque token from next_cursor"),
     current_user: User = Depends(deps.get_current_active_user),
-) -> dict[str, list[str]]:
-    """List all files uploaded by the current user"""
-    user_files: list[str] = []
-    if os.path.exists(UPLOAD_DIR):
-        all_files = os.listdir(UPLOAD_DIR)
-        user_files = [f for f in all_files if f.startswith(f"{current_user.id}_")]
-
-    return {"files": user_files}
+) -> FileListResponse:
+    """
+    List the current user's files, by name, upload date (created_at) or size.
+    When more files remain, next_cursor fetches the next page.
+    """
+    after = None
+    if cursor:
+        position = decode_cursor(cursor)
+        # A cursor only continues the listing it came from
+        if position.get("sort") != f"{sort.value}:{order}":
+            raise ValidationError("Pagination cursor is for a different sort order")
+        key = position.get("key", position["id"])
+        if not isinstance(key, str if sort == FileSort.NAME else int):
+            raise ValidationError("Invalid pagination cursor")
+        after = (key, position["id"])
+
+    # Fetch one extra row so we know whether another page exists
+    files = await crud_file.get_page(
+        db, owner_id=int(current_user.id), sort=sort, descending=order == "desc",  # type: ignore[arg-type]
+        limit=limit + 1, after=after
+    )
+    await release_connection(db)
+    next_cursor = None
+    if len(files) > limit:
+        files = files[:limit]
+        last = files[-1]
+        position = {"id": last.id, "sort": f"{sort.value}:{order}"}
+        if sort != FileSort.CREATED_AT:
+            position["key"] = getattr(last, sort.value)
+        next_cursor = encode_cursor(position)
+
+    return FileListResponse(files=[FileInfo.model_validate(f) for f in files], next_cursor=next_cursor)
@@ -0,0 +1,92 @@
+from typing import Any, Dict
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import database, metrics
+from app.core.admission import limiters
+from app.core.database import pool_stats
+from app.core.metrics import Family, TimedRoute
+from app.core.security import claims_cache, password_executor
+from app.crud.task import stats_cache
+from app.crud.user import user_cache
+
+# Operational endpoints, left out of the OpenAPI schema. They expose no user
+# data, but should only be reachable from inside the deployment.
+router = APIRouter(route_class=TimedRoute)
+
+# Mounted at the root so scrapers find it at the conventional /metrics
+metrics_router = APIRouter(route_class=TimedRoute)
+
+# pool_stats key -> metric name suffix, type and help text
+POOL_METRICS = (
+    ("checked_out", "checked_out", "gauge", "Connections currently checked out."),
+    ("overflow", "overflow", "gauge", "Overflow connections currently open."),
+    ("waits", "checkout_waits_total", "counter", "Checkouts that had to wait for a connection."),
+    ("wait_seconds_total", "checkout_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+    ("timeouts", "checkout_timeouts_total", "counter", "Checkouts that timed out."),
+)
+
+# Limiter.stats key -> metric name, type and help text; labelled by route group
+ADMISSION_METRICS = (
+    ("limit", "http_admission_limit", "gauge", "Requests allowed to run at once."),
+    ("in_flight", "http_admission_in_flight", "gauge", "Requests running."),
+    ("queued", "http_admission_queue_depth", "gauge", "Requests waiting for a slot."),
+    ("admitted", "http_admission_admitted_total", "counter", "Requests admitted."),
+    ("rejected", "http_admission_rejected_total", "counter", "Requests refused because the queue was full."),
+    ("timed_out", "http_admission_timed_out_total", "counter", "Requests refused after waiting too long."),
+)
+
+# TTLCache.stats key -> metric name, type and help text; labelled by cache
+CACHE_METRICS = (
+    ("size", "cache_entries", "gauge", "Entries held, expired ones included until evicted."),
+    ("hits", "cache_hits_total", "counter", "Lookups answered from the cache."),
+    ("misses", "cache_misses_total", "counter", "Lookups that missed or found an expired entry."),
+)
+
+@router.get("/pool")
+async def read_pool_stats() -> Dict[str, Any]:
+    """
+    Connection pool state for this worker process: connections checked out and
+    idle, overflow in use, and how often checkouts had to wait or timed out.
+    Read replicas are listed in the order of DATABASE_REPLICA_URLS.
+    """
+    return {
+        **pool_stats(database.engine.pool),
+        "replicas": [pool_stats(replica.pool) for replica in database.replica_engines],
+    }
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics() -> PlainTextResponse:
+    """
+    Request latency, per-request query counts and DB time, plus pool, password
+    hashing, admission queue and in-process cache state, for this worker process
+    in the Prometheus text format.
+    """
+    pool = pool_stats(database.engine.pool)
+    hashing = password_executor.stats()
+    families = [
+        Family(f"db_pool_{name}", kind, help, {(): pool[key]})
+        for key, name, kind, help in POOL_METRICS
+        # Only queue pools report these; SQLite's pools do not
+        if key in pool
+    ]
+    families += [
+        Family("password_hash_waiting", "gauge", "Password hashes queued for a worker.", {(): hashing["waiting"]}),
+        Family("password_hash_calls_total", "counter", "Password hashes and verifications run.", {(): hashing["calls"]}),
+        Family("password_hash_seconds_total", "counter", "Time spent hashing passwords.", {(): hashing["hash_seconds_total"]}),
+    ]
+    admission = {group: limiter.stats() for group, limiter in limiters.items()}
+    families += [
+        Family(name, kind, help, {(group,): stats[key] for group, stats in admission.items()}, ("group",))
+        for key, name, kind, help in ADMISSION_METRICS
+    ]
+    caches = {
+        "users": user_cache.stats(),
+        "token_claims": claims_cache.stats(),
+        "task_stats": stats_cache.stats(),
+    }
+    families += [
+        Family(name, kind, help, {(cache,): stats[key] for cache, stats in caches.items()}, ("cache",))
+        for key, name, kind, help in CACHE_METRICS
+    ]
+    return PlainTextResponse(metrics.render(families), media_type="text/plain; version=0.0.4")
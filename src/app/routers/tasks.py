@@ -1,30 +1,108 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.crud.task import task as crud_task
-from app.models.task import TaskCreate, TaskUpdate, TaskResponse, TaskPriority, TaskStatus
-from app.models.database import User
+from app.core.conditional import is_not_modified, make_etag, not_modified, validator_headers
+from app.core.config import settings
+from app.core.database import release_connection
+from app.core.metrics import TimedRoute, timed
+from app.core.pagination import decode_cursor, encode_cursor
+from app.crud.task import EXPORT_COLUMNS, task as crud_task
+from app.models.task import (
+    TaskCreate, TaskUpdate, TaskResponse, TaskListResponse, TaskPriority, TaskStatus, TaskStats,
+    TaskBulkUpdate, TaskBulkDelete, BulkItemError, TaskBulkResponse, TaskBulkDeleteResponse,
+    task_list_page_adapter
+)
+from app.models.database import Task, User
 from app.api import deps
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.get("/", response_model=List[TaskResponse])
+# Columns an update may not set to null; TaskUpdate allows null for every
+# field, meaning "unchanged" only when the field is left out
+NOT_NULL_COLUMNS = frozenset(column.name for column in Task.__table__.columns if not column.nullable)
+
+@router.get("/", response_model=TaskListResponse)
 async def read_tasks(
-    db: AsyncSession = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_read_db),
     skip: int = 0,
-    limit: int = Query(default=100, le=100),
+    limit: int = Query(default=100, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Opaque token from next_cursor"),
     priority: Optional[TaskPriority] = None,
     status: Optional[TaskStatus] = None,
     current_user: User = Depends(deps.get_current_active_user)
-) -> Any:
-    """Retrieve tasks."""
-    tasks = await crud_task.get_tasks_by_owner(
-        db, owner_id=int(current_user.id),  # type: ignore[arg-type]
-        skip=skip, limit=limit,
+) -> Response:
+    """
+    Retrieve tasks, ordered by id.
+    When more tasks remain, next_cursor (also sent as the X-Next-Cursor header) fetches the next page.
+    Send the ETag back as If-None-Match to get a 304 while none of your tasks have changed.
+    """
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    if cursor:
+        position = decode_cursor(cursor)
+        after_id, page = position["id"], position.get("page", 1)
+    else:
+        after_id, page = None, skip // limit + 1
+
+    # The counter rows give the totals and, through their versions, an ETag
+    # that changes with any write to the owner's tasks. Unchanged polls end
+    # here, without reading a single task.
+    counts = await crud_task.get_counts(db, owner_id=owner_id)
+    etag = make_etag(
+        "tasks", owner_id, sum(row.version for row in counts), skip, limit, cursor, priority, status
+    )
+    if is_not_modified(request, etag):
+        await release_connection(db)
+        return not_modified(etag)
+
+    # Fetch one extra row so we know whether another page exists
+    tasks = await crud_task.get_task_rows_by_owner(
+        db, owner_id=owner_id,
+        skip=skip, limit=limit + 1, after_id=after_id,
         priority=priority, status=status
     )
-    return tasks
+    # Done with the database; serializing the page should not hold the connection
+    await release_connection(db)
+    next_cursor = None
+    headers = validator_headers(etag)
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor({"id": tasks[-1]["id"], "page": page + 1})
+        headers["X-Next-Cursor"] = next_cursor
+
+    # Totals come from the per-owner counter rows rather than a COUNT(*) over tasks
+    total = 0
+    by_status: Dict[TaskStatus, int] = {}
+    by_priority: Dict[TaskPriority, int] = {}
+    for row in counts:
+        if not row.count:
+            continue
+        by_status[row.status] = by_status.get(row.status, 0) + row.count  # type: ignore[index, call-overload]
+        by_priority[row.priority] = by_priority.get(row.priority, 0) + row.count  # type: ignore[index, call-overload]
+        if (status is None or row.status == status) and (priority is None or row.priority == priority):
+            total += row.count  # type: ignore[assignment]
+
+    # The rows already have TaskResponse's shape, so skip response_model
+    # validation and encode them straight to bytes
+    with timed("serialize"):
+        body = task_list_page_adapter.dump_json({
+            "tasks": tasks,  # type: ignore[typeddict-item]
+            "total": total,
+            "page": page,
+            "per_page": limit,
+            "next_cursor": next_cursor,
+            "by_status": by_status,
+            "by_priority": by_priority,
+        })
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("/", response_model=TaskResponse, status_code=201)
 async def create_task(
@@ -39,22 +117,236 @@ async def create_task(
     )
     return task
 
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+def _ownership_errors(
+    ids: List[int], owners: Dict[int, int], owner_id: int, indexes: List[int]
+) -> List[BulkItemError]:
+    errors: List[BulkItemError] = []
+    for index, task_id in zip(indexes, ids):
+        if task_id not in owners:
+            errors.append(BulkItemError(index=index, id=task_id, detail="Task not found"))
+        elif owners[task_id] != owner_id:
+            errors.append(BulkItemError(index=index, id=task_id, detail="Not authorized to access this task"))
+    return errors
+
+@router.post("/bulk", response_model=TaskBulkResponse)
+async def create_tasks_bulk(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    items: List[Dict[str, Any]] = Body(..., max_length=settings.BULK_MAX_ITEMS),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Create many tasks in one transaction.
+    Items are validated one by one; invalid items are reported in `errors` and the rest are created.
+    """
+    tasks_in: List[TaskCreate] = []
+    errors: List[BulkItemError] = []
+    for index, item in enumerate(items):
+        try:
+            tasks_in.append(TaskCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append(BulkItemError(index=index, detail=_validation_detail(e)))
+
+    tasks = await crud_task.create_many_with_owner(
+        db, objs_in=tasks_in, owner_id=int(current_user.id)  # type: ignore[arg-type]
+    )
+    return {"tasks": tasks, "errors": errors}
+
+@router.patch("/bulk", response_model=TaskBulkResponse)
+async def update_tasks_bulk(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    items: List[Dict[str, Any]] = Body(..., max_length=settings.BULK_MAX_ITEMS),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Update many tasks in one transaction.
+    Each item carries the task `id` plus the fields to change.
+    """
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    updates: Dict[int, TaskBulkUpdate] = {}
+    indexes: Dict[int, int] = {}
+    errors: List[BulkItemError] = []
+    for index, item in enumerate(items):
+        try:
+            task_in = TaskBulkUpdate.model_validate(item)
+        except ValidationError as e:
+            errors.append(BulkItemError(index=index, id=item.get("id"), detail=_validation_detail(e)))
+            continue
+        if task_in.id in updates:
+            errors.append(BulkItemError(index=index, id=task_in.id, detail="Duplicate task id in request"))
+            continue
+        nulls = sorted(
+            name for name in task_in.model_fields_set & NOT_NULL_COLUMNS if getattr(task_in, name) is None
+        )
+        if nulls:
+            # Left to the database, one null would fail the whole executemany
+            errors.append(BulkItemError(index=index, id=task_in.id, detail=f"{', '.join(nulls)}: may not be null"))
+            continue
+        updates[task_in.id] = task_in
+        indexes[task_in.id] = index
+
+    # One query classifies every id as owned, someone else's or missing
+    ids = list(updates)
+    owners = await crud_task.get_owner_ids(db, ids=ids)
+    errors.extend(_ownership_errors(ids, owners, owner_id, [indexes[i] for i in ids]))
+
+    rows = [
+        {"id": task_id, **task_in.model_dump(exclude_unset=True, exclude={"id"})}
+        for task_id, task_in in updates.items()
+        if owners.get(task_id) == owner_id
+    ]
+    tasks = await crud_task.update_many(db, objs_in=rows)
+    errors.sort(key=lambda err: err.index)
+    return {"tasks": sorted(tasks, key=lambda t: indexes[int(t.id)]), "errors": errors}  # type: ignore[arg-type]
+
+@router.delete("/bulk", response_model=TaskBulkDeleteResponse)
+async def delete_tasks_bulk(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    body: TaskBulkDelete,
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """Delete many tasks with a single DELETE statement."""
+    if len(body.ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.BULK_MAX_ITEMS} ids per request")
+
+    owner_id = int(current_user.id)  # type: ignore[arg-type]
+    owners = await crud_task.get_owner_ids(db, ids=body.ids)
+    errors = _ownership_errors(body.ids, owners, owner_id, list(range(len(body.ids))))
+
+    # First position of each owned id, so the response keeps request order
+    owned: Dict[int, int] = {}
+    for position, task_id in enumerate(body.ids):
+        if owners.get(task_id) == owner_id:
+            owned.setdefault(task_id, position)
+    deleted = await crud_task.remove_many(db, ids=list(owned))
+    deleted_ids = sorted((int(task.id) for task in deleted), key=owned.__getitem__)  # type: ignore[arg-type]
+    return {"deleted": deleted_ids, "errors": errors}
+
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+EXPORT_CHUNK_ROWS = 500  # rows encoded per chunk handed to the server
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _export_chunks(
+    session_factory: async_sessionmaker[AsyncSession], owner_id: int, format: str
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(EXPORT_FIELDS)
+
+    async with session_factory() as db:
+        rows = 0
+        async for row in crud_task.stream_by_owner(db, owner_id=owner_id):
+            values = [_export_value(value) for value in row]
+            if format == "csv":
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values))))
+                buffer.write("\n")
+
+            rows += 1
+            if rows % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+@router.get("/stats", response_model=TaskStats)
+async def read_task_stats(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Counts of the current user's tasks by status and priority, plus how many open tasks are overdue or due soon.
+    Computed with one grouped query and cached per user until their tasks change.
+    """
+    stats = await crud_task.get_stats(db, owner_id=int(current_user.id))  # type: ignore[arg-type]
+    await release_connection(db)
+    return stats
+
+@router.get("/search", response_model=List[TaskResponse])
+async def search_tasks(
+    db: AsyncSession = Depends(deps.get_read_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Full-text search over the current user's task titles and descriptions.
+    Results are ranked by relevance, with matches in the title ranked above matches in the description.
+    """
+    tasks = await crud_task.search(db, owner_id=int(current_user.id), q=q, limit=limit)  # type: ignore[arg-type]
+    await release_connection(db)
+    return tasks
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    session_factory: async_sessionmaker[AsyncSession] = Depends(deps.get_session_factory),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> StreamingResponse:
+    """
+    Export all of the current user's tasks as NDJSON or CSV.
+    Rows are streamed from a server-side cursor, so memory use does not grow with the number of tasks.
+    """
+    return StreamingResponse(
+        _export_chunks(session_factory, int(current_user.id), format),  # type: ignore[arg-type]
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
 @router.get("/{id}", response_model=TaskResponse)
 async def read_task(
     *,
-    db: AsyncSession = Depends(deps.get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db),
     id: int,
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
-    """Get task by ID."""
+    """
+    Get task by ID.
+    Supports If-None-Match (ETag) and If-Modified-Since (Last-Modified) for cheap polling.
+    """
+    # Ownership and validators first, from one narrow row; the task itself is
+    # only loaded when the client's copy is stale
+    validators = await crud_task.get_cache_validators(db, id=id)
+
+    if not validators:
+        await release_connection(db)
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if int(validators.owner_id) != int(current_user.id):  # type: ignore[arg-type]
+        await release_connection(db)
+        raise HTTPException(status_code=403, detail="Not authorized to access this task")
+
+    # updated_at has one-second resolution on SQLite, so the owner's version
+    # also goes into the ETag to tell apart two writes within the same second
+    etag = make_etag("task", id, validators.updated_at, validators.owner_version)
+    if is_not_modified(request, etag, validators.updated_at):
+        await release_connection(db)
+        return not_modified(etag, validators.updated_at)
+
     task = await crud_task.get(db, id=id)
-   
+    await release_connection(db)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    if int(task.owner_id) != int(current_user.id):  # type: ignore[arg-type]
-        raise HTTPException(status_code=403, detail="Not authorized to access this task")
-    
+    response.headers.update(validator_headers(etag, validators.updated_at))
     return task
 
 @router.put("/{id}", response_model=TaskResponse)
@@ -66,14 +358,15 @@ async def update_task(
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
     """Update a task."""
-    task = await crud_task.get(db, id=id)
-    if not task:
+    task, exists = await crud_task.update_returning(
+        db, id=id, obj_in=task_in, owner_id=int(current_user.id)  # type: ignore[arg-type]
+    )
+    if not exists:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    if int(task.owner_id) != int(current_user.id):  # type: ignore[arg-type]
+
+    if task is None:
         raise HTTPException(status_code=403, detail="Not authorized to update this task")
-    
-    task = await crud_task.update(db, db_obj=task, obj_in=task_in)
+
     return task
 
 @router.delete("/{id}")
@@ -84,12 +377,13 @@ async def delete_task(
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
     """Delete a task."""
-    task = await crud_task.get(db, id=id)
-    if not task:
+    task, exists = await crud_task.delete_returning(
+        db, id=id, owner_id=int(current_user.id)  # type: ignore[arg-type]
+    )
+    if not exists:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    if int(task.owner_id) != int(current_user.id):  # type: ignore[arg-type]
+
+    if task is None:
         raise HTTPException(status_code=403, detail="Not authorized to delete this task")
-    
-    await crud_task.remove(db, id=id)
+
     return {"message": "Task deleted successfully"}
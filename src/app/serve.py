@@ -0,0 +1,172 @@
+"""
+    Production entry point: `serve` (or `python -m app.serve`) runs the API in
+    several worker processes sharing one listening socket.
+
+    The app is built once in the supervising process and the workers are forked
+    from it, so they share the imported code copy-on-write and each one boots in
+    milliseconds. uvicorn's own --workers starts workers by spawning fresh
+    interpreters, which re-import everything per worker.
+
+    SIGTERM or SIGINT shuts down gracefully: workers stop accepting connections,
+    finish in-flight requests (up to the graceful timeout), then run the app's
+    lifespan shutdown, which disposes the database engines.
+"""
+import argparse
+import gc
+import logging
+import logging.config
+import os
+import signal
+import socket
+import sys
+from types import FrameType
+from typing import Optional, Set
+
+import uvicorn
+from fastapi import FastAPI
+from uvicorn.config import LOGGING_CONFIG
+
+from app.core.config import settings
+from app.main import create_app
+
+logger = logging.getLogger("uvicorn.error")
+
+# Exit status of a worker whose lifespan startup failed (uvicorn uses the same)
+STARTUP_FAILURE = 3
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def run_worker(app: FastAPI, sock: socket.socket, args: argparse.Namespace) -> int:
+    """Serve requests until told to stop; the exit status of a worker process."""
+    # The supervisor's handlers were inherited. uvicorn installs its own while it
+    # serves and re-raises the signal once it has shut down, so until then (and
+    # after) the worker ignores it and exits normally.
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_config=None,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0 if server.started else STARTUP_FAILURE
+
+
+class Supervisor:
+    """Forks the workers, replaces any that crash, and stops them all on a signal."""
+
+    def __init__(self, app: FastAPI, sock: socket.socket, args: argparse.Namespace) -> None:
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Set[int] = set()
+        self.stopping = False
+        self.exit_code = 0
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(self.app, self.sock, self.args)
+            finally:
+                # Never return into the supervisor's code in the child
+                os._exit(code)
+        self.workers.add(pid)
+
+    def stop(self, sig: int = signal.SIGTERM, frame: Optional[FrameType] = None) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Stopping %d workers", len(self.workers))
+        self.signal_workers(signal.SIGTERM)
+        # Workers get the graceful timeout plus time for their lifespan shutdown
+        signal.signal(signal.SIGALRM, lambda sig, frame: self.signal_workers(signal.SIGKILL))
+        signal.alarm(self.args.graceful_timeout + 10)
+
+    def signal_workers(self, sig: int) -> None:
+        for pid in self.workers:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self.workers.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            if code == STARTUP_FAILURE:
+                # Replacing it would fail the same way; take the whole server down
+                logger.error("Worker %d failed to start, shutting down", pid)
+                self.exit_code = STARTUP_FAILURE
+                self.stop()
+            else:
+                logger.error("Worker %d exited with status %d, starting a replacement", pid, code)
+                self.spawn()
+        signal.alarm(0)
+        return self.exit_code
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS,
+                        help="worker processes; 0 starts one per available core")
+    parser.add_argument("--backlog", type=int, default=settings.SERVE_BACKLOG)
+    parser.add_argument("--keep-alive", type=int, default=settings.SERVE_KEEP_ALIVE_SECONDS,
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVE_GRACEFUL_TIMEOUT_SECONDS,
+                        help="seconds shutdown waits for in-flight requests")
+    args = parser.parse_args(argv)
+    if args.workers <= 0:
+        args.workers = os.process_cpu_count() or 1
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.config.dictConfig(LOGGING_CONFIG)
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    # Preload: import and build everything once, before forking
+    app = create_app()
+    # Keep the collector off the preloaded objects, so it doesn't write to (and
+    # un-share) the pages the workers inherited
+    gc.collect()
+    gc.freeze()
+
+    host, port = sock.getsockname()[:2]
+    logger.info("Listening on http://%s:%d with %d workers", host, port, args.workers)
+    code = Supervisor(app, sock, args).run()
+    sock.close()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
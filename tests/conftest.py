@@ -10,7 +10,8 @@ from app.main import task_app as app
 from app.core.database import Base
 from app.api import deps
 from app.models.database import User
-from app.crud.user import user as crud_user
+from app.crud.task import stats_cache
+from app.crud.user import user as crud_user, user_cache
 from app.models.user import UserCreate
 
 # Test database URL - use SQLite in memory
@@ -35,6 +36,13 @@ test_engine = create_async_engine(
     echo=False
 )
 
+# Session factory bound to the test engine
+testing_session_local = async_sessionmaker(
+    test_engine, 
+    class_=AsyncSession, 
+    expire_on_commit=False
+)
+
 @pytest_asyncio.fixture(scope="function")
 async def db_setup() -> AsyncGenerator[None, None]:
     """Set up the database tables before each test and tear down after"""
@@ -47,13 +55,6 @@ async def db_setup() -> AsyncGenerator[None, None]:
 @pytest_asyncio.fixture
 async def db(db_setup: None) -> AsyncGenerator[AsyncSession, None]:  # type: ignore[type-arg]
     """Create a fresh database session for each test"""
-    # Create session factory for this test
-    testing_session_local = async_sessionmaker(
-        test_engine, 
-        class_=AsyncSession, 
-        expire_on_commit=False
-    )
-    
     # Create a new session for the test
     async with testing_session_local() as session:
         yield session
@@ -65,7 +66,12 @@ async def client(db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
         yield db
 
+    # Cached users and stats would outlive the per-test database
+    user_cache.clear()
+    stats_cache.clear()
     app.dependency_overrides[deps.get_db] = override_get_db
+    app.dependency_overrides[deps.get_read_db] = override_get_db
+    app.dependency_overrides[deps.get_session_factory] = lambda: testing_session_local
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as c:
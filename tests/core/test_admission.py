@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import Limiter, route_group
+
+
+def test_route_group():
+    assert route_group("/auth/login") == "auth"
+    assert route_group("/tasks") == "tasks"
+    assert route_group("/tasks/7") == "tasks"
+    assert route_group("/download/a.txt") == "files"
+    assert route_group("/tasksfoo") is None
+    assert route_group("/metrics") is None
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_refuses():
+    limiter = Limiter(limit=1, queue_size=1, queue_timeout=5)
+    assert await limiter.acquire()
+
+    queued = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    # Queue full
+    assert not await limiter.acquire()
+
+    # The running request finishing hands its slot to the waiter
+    limiter.release()
+    assert await queued
+    assert limiter.stats() == {
+        "limit": 1, "queue_size": 1, "in_flight": 1, "queued": 0,
+        "admitted": 2, "rejected": 1, "timed_out": 0,
+    }
+    limiter.release()
+    assert limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_limiter_wait_times_out():
+    limiter = Limiter(limit=1, queue_size=5, queue_timeout=0.01)
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert limiter.timed_out == 1
+    assert limiter.queued == 0
+
+    # A cancelled waiter doesn't take the slot with it
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    limiter.release()
+    assert limiter.in_flight == 0
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.util import greenlet_spawn
+
+from app.core import database
+from app.core.config import Settings
+from app.core.database import InstrumentedPool, engine_options, pool_stats
+from app.main import task_app
+
+
+class FakeConnection:
+    def close(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+
+def test_engine_options_follow_settings():
+    options = engine_options(Settings(
+        DATABASE_URL="postgresql+asyncpg://u:p@db/app", DB_POOL_SIZE=20, DB_STATEMENT_CACHE_SIZE=0
+    ))
+    assert options["echo"] is False
+    assert options["poolclass"] is InstrumentedPool
+    assert options["pool_size"] == 20
+    assert options["connect_args"] == {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+
+    # SQLite keeps its default pool and has no asyncpg options
+    assert engine_options(Settings(DATABASE_URL="sqlite+aiosqlite:///:memory:", DB_ECHO=True)) == {"echo": True}
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_counts_waits_and_timeouts():
+    # The async pool's queue only works inside SQLAlchemy's greenlet bridge
+    pool = InstrumentedPool(FakeConnection, pool_size=1, max_overflow=0, timeout=0.05)
+    first = await greenlet_spawn(pool.connect)
+
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+
+    # A checkout that waits for a connection returned by another task
+    async def release() -> None:
+        await asyncio.sleep(0.02)
+        await greenlet_spawn(first.close)
+
+    releasing = asyncio.create_task(release())
+    second = await greenlet_spawn(pool.connect)
+    await releasing
+    stats = pool_stats(pool)
+    await greenlet_spawn(second.close)
+
+    assert stats["checked_out"] == 1 and stats["checked_in"] == 0 and stats["overflow"] == 0
+    assert stats["waits"] == 2
+    assert stats["timeouts"] == 1
+    assert 0 < stats["wait_seconds_max"] <= stats["wait_seconds_total"]
+    assert pool_stats(StaticPool(FakeConnection)) == {"pool_class": "StaticPool"}
+
+
+@pytest.mark.asyncio
+async def test_internal_pool_stats(monkeypatch):
+    # Engines are created without connecting, so the primary needs no server
+    settings = Settings(DATABASE_URL="postgresql+asyncpg://u:p@db/app", DB_POOL_SIZE=3, DB_MAX_OVERFLOW=2)
+    primary = create_async_engine(settings.DATABASE_URL, **engine_options(settings))
+    replica_url = "sqlite+aiosqlite:///:memory:"
+    replica = create_async_engine(replica_url, **engine_options(settings, replica_url))
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "replica_engines", [replica])
+    try:
+        # No database session is involved, so no test database either
+        async with AsyncClient(transport=ASGITransport(app=task_app), base_url="http://test") as client:
+            response = await client.get("/internal/pool")
+    finally:
+        await primary.dispose()
+        await replica.dispose()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data == {**pool_stats(primary.pool), "replicas": [pool_stats(replica.pool)]}
+    assert data["pool_class"] == "InstrumentedPool"
+    assert (data["size"], data["max_overflow"], data["checked_out"], data["waits"]) == (3, 2, 0, 0)
+    assert data["replicas"][0]["pool_class"] == type(replica.pool).__name__
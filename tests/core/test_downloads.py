@@ -0,0 +1,84 @@
+import email
+from typing import Any, List
+
+import pytest
+
+from app.core.downloads import MAX_RANGES, RangeFileResponse, etag_matches, parse_ranges
+
+def test_parse_ranges():
+    assert parse_ranges("bytes=0-99", 1000) == [(0, 100)]
+    assert parse_ranges("bytes=900-", 1000) == [(900, 1000)]
+    assert parse_ranges("bytes=990-2000", 1000) == [(990, 1000)]
+    # Suffix ranges, including one longer than the file
+    assert parse_ranges("bytes=-100", 1000) == [(900, 1000)]
+    assert parse_ranges("bytes=-5000", 1000) == [(0, 1000)]
+    # Sorted, with overlapping and adjacent ranges merged
+    assert parse_ranges("bytes=500-599, 0-9, 5-19, 20-29", 1000) == [(0, 30), (500, 600)]
+    # Unsatisfiable ranges are dropped; none left means 416
+    assert parse_ranges("bytes=0-9, 2000-3000", 1000) == [(0, 10)]
+    assert parse_ranges("bytes=1000-", 1000) == []
+    assert parse_ranges("bytes=-0", 1000) == []
+    # Ignored: the whole file is sent
+    for header in ("bytes=", "bytes=-", "bytes=9-1", "bytes=a-b", "items=0-9", "bytes=1-2-3", "bytes=²-9"):
+        assert parse_ranges(header, 1000) is None, header
+    assert parse_ranges("bytes=" + ",".join(["0-0"] * (MAX_RANGES + 1)), 1000) is None
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+
+async def call(response: RangeFileResponse, headers: dict[str, str], extensions: dict[str, Any]) -> List[dict[str, Any]]:
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "extensions": extensions,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    messages: List[dict[str, Any]] = []
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        messages.append(message)
+
+    await response(scope, receive, send)
+    return messages
+
+@pytest.mark.asyncio
+async def test_multipart_byteranges(tmp_path):
+    path = tmp_path / "data.bin"
+    content = bytes(range(256)) * 4
+    path.write_bytes(content)
+
+    messages = await call(RangeFileResponse(path, media_type="application/pdf"), {"Range": "bytes=0-9, 1000-"}, {})
+    start = messages[0]
+    body = b"".join(m["body"] for m in messages[1:])
+    response_headers = dict((k.decode(), v.decode()) for k, v in start["headers"])
+    assert start["status"] == 206
+    assert int(response_headers["content-length"]) == len(body)
+    assert "content-range" not in response_headers
+
+    # Parses as a standard MIME multipart document
+    message = email.message_from_bytes(b"Content-Type: " + response_headers["content-type"].encode() + b"\r\n\r\n" + body)
+    assert message.get_content_type() == "multipart/byteranges"
+    parts = message.get_payload()
+    assert [part["Content-Range"] for part in parts] == ["bytes 0-9/1024", "bytes 1000-1023/1024"]
+    assert [part.get_payload(decode=True) for part in parts] == [content[:10], content[1000:]]
+    assert all(part.get_content_type() == "application/pdf" for part in parts)
+
+@pytest.mark.asyncio
+async def test_zerocopy_send_when_the_server_offers_it(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 100_000)
+
+    messages = await call(RangeFileResponse(path), {"Range": "bytes=10-70009"}, {"http.response.zerocopysend": {}})
+    assert messages[0]["status"] == 206
+    sends = [m for m in messages if m["type"] == "http.response.zerocopysend"]
+    # One message for the whole range: no file data passes through Python
+    assert [(m["offset"], m["count"]) for m in sends] == [(10, 70_000)]
+    assert sends[0]["file"].name == str(path)
+    assert messages[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+    messages = await call(RangeFileResponse(path), {}, {"http.response.pathsend": {}})
+    assert messages[1] == {"type": "http.response.pathsend", "path": str(path)}
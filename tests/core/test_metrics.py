@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.metrics import Histogram, RequestTimings, current_timings
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Request latency.", ("route",), (0.1, 1.0))
+    histogram.observe(("/a",), 0.05)
+    histogram.observe(("/a",), 0.5)
+    histogram.observe(("/a",), 5)
+    histogram.observe(('/"b"',), 0.1)
+
+    lines = list(histogram.render())
+    assert lines[:2] == ["# HELP latency_seconds Request latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    # Label values are escaped
+    assert 'latency_seconds_bucket{route="/\\"b\\"",le="0.1"} 1' in lines
+
+
+def test_server_timing_header():
+    timings = RequestTimings(started=0, db_queries=3, db_seconds=0.012, auth_seconds=0.001, serialize_seconds=0.0025)
+    assert timings.server_timing(0.02) == (
+        'auth;dur=1.00, db;dur=12.00;desc="3 queries", serialize;dur=2.50, total;dur=20.00'
+    )
+
+
+def test_failed_statements_leave_no_start_times_behind():
+    engine = create_engine("sqlite://")
+    timings = RequestTimings(started=0)
+    token = current_timings.set(timings)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(exc.OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+            assert conn.info["query_started"] == []
+    finally:
+        current_timings.reset(token)
+    # Failed statements still took database time
+    assert timings.db_queries == 4
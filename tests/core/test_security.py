@@ -0,0 +1,88 @@
+import asyncio
+from datetime import timedelta
+from typing import Any
+
+import pytest
+
+from app.core import security
+from app.core.cache import TTLCache
+
+
+def test_verify_token_round_trip():
+    token = security.create_access_token("alice")
+    assert security.verify_token(token) == "alice"
+    # Second verification is served from the claims cache
+    hits = security.claims_cache.hits
+    assert security.verify_token(token) == "alice"
+    assert security.claims_cache.hits == hits + 1
+
+
+def test_cached_claims_are_not_shared_with_callers():
+    token = security.create_access_token("alice")
+    # Mutating what the first (miss) and a later (hit) call return leaves the cache intact
+    security.decode_access_token(token)["sub"] = "mallory"  # type: ignore[index]
+    security.decode_access_token(token)["sub"] = "mallory"  # type: ignore[index]
+    assert security.verify_token(token) == "alice"
+
+
+def test_verify_token_rejects_tampered_and_expired_tokens():
+    token = security.create_access_token("alice")
+    assert security.verify_token(token[:-2] + "xx") is None
+    assert security.verify_token(security.create_access_token("bob", timedelta(seconds=-1))) is None
+
+
+def test_cached_claims_do_not_outlive_exp(monkeypatch):
+    now = [0.0]
+    cache: TTLCache[bytes, dict[str, Any]] = TTLCache(maxsize=10, ttl=300, clock=lambda: now[0])
+    monkeypatch.setattr(security, "claims_cache", cache)
+
+    token = security.create_access_token("carol", timedelta(seconds=60))
+    assert security.verify_token(token) == "carol"
+    now[0] = 59
+    security.verify_token(token)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The 300s cache TTL is capped by the token's remaining lifetime
+    now[0] = 61
+    security.verify_token(token)
+    assert cache.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_password_executor_caps_concurrency_without_blocking_the_loop():
+    executor = security.PasswordExecutor(kind="thread", max_concurrency=2)
+    hashed = security.get_password_hash("secret")
+    peak = 0
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal peak, ticks
+        while True:
+            peak = max(peak, executor.running)
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticking = asyncio.create_task(ticker())
+    results = await asyncio.gather(*(executor.verify("secret", hashed) for _ in range(6)))
+    ticking.cancel()
+    executor.shutdown()
+
+    assert results == [True] * 6
+    assert peak == 2
+    # The loop kept running other work while bcrypt did
+    assert ticks > 1
+    stats = executor.stats()
+    assert stats["calls"] == 6 and stats["waiting"] == 0 and stats["running"] == 0
+    assert stats["wait_seconds_max"] > 0
+    assert stats["hash_seconds_total"] >= stats["hash_seconds_max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_password_executor_process_pool():
+    executor = security.PasswordExecutor(kind="process", max_concurrency=1)
+    try:
+        hashed = await executor.hash("secret")
+        assert await executor.verify("secret", hashed)
+        assert not await executor.verify("wrong", hashed)
+    finally:
+        executor.shutdown()
@@ -1,7 +1,14 @@
+import asyncio
+from typing import AsyncGenerator
 import pytest
 from httpx import AsyncClient
-# from sqlalchemy.ext.asyncio import AsyncSession
-# from app.crud.user import user as crud_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api import deps
+from app.core import admission
+from app.core.admission import Limiter
+from app.core.security import create_access_token
+from app.crud.user import user as crud_user, user_cache
+from tests import conftest
 
 @pytest.mark.asyncio
 async def test_register_user(client: AsyncClient):
@@ -54,3 +61,50 @@ async def test_get_current_user(client: AsyncClient, test_user): # type: ignore[
     assert response.status_code == 200
     data = response.json()
     assert data["username"] == "testuser"
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_until_updated(client: AsyncClient, db: AsyncSession, test_user):
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    await client.get("/auth/me", headers=headers)
+    hits = user_cache.hits
+    response = await client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert user_cache.hits == hits + 1
+
+    # Deactivating through CRUDUser drops the cached copy straight away
+    await crud_user.update(db, db_obj=test_user, obj_in={"is_active": False})
+    response = await client.get("/auth/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+@pytest.mark.asyncio
+async def test_login_flood_is_shed_without_blocking_tasks(client: AsyncClient, test_user, monkeypatch): # type: ignore[unused-argument]
+    monkeypatch.setitem(admission.limiters, "auth", Limiter(limit=1, queue_size=0, queue_timeout=1))
+    # Concurrent requests can't share the fixture's one session
+    async def own_session() -> AsyncGenerator[AsyncSession, None]:
+        async with conftest.testing_session_local() as session:
+            yield session
+    monkeypatch.setitem(conftest.app.dependency_overrides, deps.get_db, own_session)
+    monkeypatch.setitem(conftest.app.dependency_overrides, deps.get_read_db, own_session)
+    headers = {"Authorization": f"Bearer {create_access_token('testuser')}"}
+    login = {"username": "testuser", "password": "TestPassword123"}
+
+    responses = await asyncio.gather(
+        *(client.post("/auth/login/access-token", data=login) for _ in range(3)),
+        client.get("/tasks/", headers=headers),
+    )
+    logins, tasks = responses[:3], responses[3]
+    # One login runs; with no queue the others are refused at once
+    assert sorted(r.status_code for r in logins) == [200, 503, 503]
+    refused = next(r for r in logins if r.status_code == 503)
+    assert refused.headers["Retry-After"] == "1"
+    assert tasks.status_code == 200
+
+    body = (await client.get("/metrics")).text
+    assert 'http_admission_rejected_total{group="auth"} 2' in body
+    assert 'http_admission_queue_depth{group="tasks"} 0' in body
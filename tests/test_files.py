@@ -0,0 +1,228 @@
+import hashlib
+import os
+import pytest
+from httpx import AsyncClient
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud.user import user as crud_user
+from app.models.database import Blob
+from app.models.user import UserCreate
+from app.routers import files
+
+def stored_blobs(upload_dir: str) -> list[str]:
+    # Paths of the stored blobs, relative to the upload directory
+    return sorted(
+        os.path.relpath(os.path.join(root, name), upload_dir)
+        for root, _, names in os.walk(os.path.join(upload_dir, "blobs")) for name in names
+    )
+
+def sharded(sha256: str) -> str:
+    return os.path.join("blobs", sha256[:2], sha256[2:4], sha256)
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch) -> str: # type: ignore[no-untyped-def]
+    monkeypatch.setattr(files, "UPLOAD_DIR", str(tmp_path))
+    return str(tmp_path)
+
+@pytest.fixture
+def headers(test_user) -> dict[str, str]: # type: ignore[no-untyped-def]
+    return {"Authorization": f"Bearer {create_access_token(test_user.username)}"}
+
+@pytest.mark.asyncio
+async def test_upload_streams_file_into_place(client: AsyncClient, upload_dir: str, headers, monkeypatch): # type: ignore[no-untyped-def]
+    # Several writes per file, and a size that isn't a multiple of the chunk
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", 1000)
+    content = bytes(range(256)) * 40 + b"tail"
+
+    response = await client.post(
+        "/upload", data={"note": "ignored"}, files={"file": ("../report.pdf", content)}, headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["filename"] == "report.pdf"
+    assert data["file_size"] == len(content)
+    # Only the finished file is left: no temp file, nothing outside the directory
+    assert stored_blobs(upload_dir) == [sharded(hashlib.sha256(content).hexdigest())]
+    assert data["file_path"] == os.path.join(upload_dir, sharded(hashlib.sha256(content).hexdigest()))
+
+    response = await client.get("/download/report.pdf", headers=headers)
+    assert response.status_code == 200
+    assert response.content == content
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_refused(client: AsyncClient, upload_dir: str, headers, monkeypatch): # type: ignore[no-untyped-def]
+    monkeypatch.setattr(files, "MAX_FILE_SIZE", 4096)
+
+    # Within the declared-length allowance, so refused while streaming
+    response = await client.post("/upload", files={"file": ("big.txt", b"x" * 5000)}, headers=headers)
+    assert response.status_code == 413
+    assert response.json()["detail"] == "File size exceeds the maximum limit of 4096 bytes"
+
+    # Declared far too large: refused from Content-Length before reading the body
+    response = await client.post("/upload", files={"file": ("big.txt", b"x" * 100_000)}, headers=headers)
+    assert response.status_code == 413
+
+    response = await client.post("/upload", files={"file": ("fits.txt", b"x" * 4096)}, headers=headers)
+    assert response.status_code == 200
+    assert sorted(os.listdir(upload_dir)) == ["blobs"]
+    assert len(stored_blobs(upload_dir)) == 1
+
+@pytest.mark.asyncio
+async def test_upload_rejects_bad_requests(client: AsyncClient, upload_dir: str, headers): # type: ignore[no-untyped-def]
+    response = await client.post("/upload", files={"file": ("script.sh", b"echo hi")}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("File type not allowed")
+
+    response = await client.post("/upload", files={"other": ("notes.txt", b"hi")}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No file uploaded"
+
+    response = await client.post("/upload", content=b"hi", headers={**headers, "Content-Type": "text/plain"})
+    assert response.status_code == 400
+
+    # Authentication comes before the body
+    response = await client.post("/upload", files={"file": ("notes.txt", b"hi")})
+    assert response.status_code == 403
+    assert os.listdir(upload_dir) == []
+
+@pytest.mark.asyncio
+async def test_download_ranges_and_revalidation(client: AsyncClient, upload_dir: str, headers): # type: ignore[no-untyped-def]
+    content = bytes(range(256)) * 4
+    response = await client.post("/upload", files={"file": ("doc.pdf", content)}, headers=headers)
+    assert response.status_code == 200
+
+    response = await client.get("/download/doc.pdf", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    assert etag == f'"{hashlib.sha256(content).hexdigest()}"'
+
+    # Resuming an interrupted download
+    response = await client.get("/download/doc.pdf", headers={**headers, "Range": "bytes=1000-", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 1000-1023/1024"
+    assert response.content == content[1000:]
+
+    # The file changed since: the whole new file instead
+    response = await client.get("/download/doc.pdf", headers={**headers, "Range": "bytes=1000-", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+    response = await client.get("/download/doc.pdf", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await client.get("/download/doc.pdf", headers={**headers, "Range": "bytes=2000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+@pytest.mark.asyncio
+async def test_duplicate_contents_are_stored_once(client: AsyncClient, db: AsyncSession, upload_dir: str, headers): # type: ignore[no-untyped-def]
+    other = await crud_user.create(db, obj_in=UserCreate(
+        username="otheruser", email="other@example.com", password="OtherPassword123"
+    ))
+    other_headers = {"Authorization": f"Bearer {create_access_token(str(other.username))}"}
+    content = b"shared attachment" * 100
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    async def ref_counts() -> dict[str, int]:
+        db.expire_all()
+        return {str(b.sha256): int(b.ref_count) for b in (await db.execute(select(Blob))).scalars()}  # type: ignore[arg-type]
+
+    for name, h in (("a.pdf", headers), ("b.pdf", headers), ("a.pdf", other_headers)):
+        response = await client.post("/upload", files={"file": (name, content)}, headers=h)
+        assert response.status_code == 200
+    # Uploading the same contents under the same name again changes nothing
+    response = await client.post("/upload", files={"file": ("a.pdf", content)}, headers=headers)
+    assert response.status_code == 200
+    assert stored_blobs(upload_dir) == [sharded(sha256)]
+    assert await ref_counts() == {sha256: 3}
+
+    response = await client.get("/files", headers=headers)
+    assert [f["name"] for f in response.json()["files"]] == ["a.pdf", "b.pdf"]
+    assert (await client.delete("/delete/a.pdf", headers=headers)).status_code == 200
+    assert (await client.delete("/delete/a.pdf", headers=headers)).status_code == 404
+    assert (await client.delete("/delete/b.pdf", headers=headers)).status_code == 200
+    # Still referenced by the other user's file
+    assert await ref_counts() == {sha256: 1}
+    response = await client.get("/download/a.pdf", headers=other_headers)
+    assert response.content == content
+
+    # Replacing the last file naming a blob deletes the blob
+    response = await client.post("/upload", files={"file": ("a.pdf", b"new contents")}, headers=other_headers)
+    assert response.status_code == 200
+    new_sha256 = hashlib.sha256(b"new contents").hexdigest()
+    assert stored_blobs(upload_dir) == [sharded(new_sha256)]
+    assert await ref_counts() == {new_sha256: 1}
+
+    assert (await client.delete("/delete/a.pdf", headers=other_headers)).status_code == 200
+    assert stored_blobs(upload_dir) == []
+    assert await ref_counts() == {}
+
+@pytest.mark.asyncio
+async def test_files_in_the_old_flat_layout_are_still_served(client: AsyncClient, upload_dir: str, headers, test_user, monkeypatch): # type: ignore[no-untyped-def]
+    for name in (f"{test_user.id}_old.txt", f"{test_user.id}_kept.txt", f"{test_user.id + 1}_theirs.txt"):
+        with open(os.path.join(upload_dir, name), "wb") as f:
+            f.write(b"legacy")
+
+    # Listings only cover the files table
+    response = await client.get("/files", headers=headers)
+    assert response.json() == {"files": [], "next_cursor": None}
+    response = await client.get("/download/old.txt", headers=headers)
+    assert response.content == b"legacy"
+    assert (await client.get("/download/theirs.txt", headers=headers)).status_code == 404
+
+    # Deleted from the old layout, or replaced by an upload into the new one
+    assert (await client.delete("/delete/old.txt", headers=headers)).status_code == 200
+    response = await client.post("/upload", files={"file": ("kept.txt", b"new")}, headers=headers)
+    assert response.status_code == 200
+    assert sorted(os.listdir(upload_dir)) == [f"{test_user.id + 1}_theirs.txt", "blobs"]
+    response = await client.get("/download/kept.txt", headers=headers)
+    assert response.content == b"new"
+
+    # Once the old layout is retired, unknown names aren't looked for on disk
+    monkeypatch.setattr(settings, "UPLOAD_LEGACY_LAYOUT", False)
+    with open(os.path.join(upload_dir, f"{test_user.id}_old.txt"), "wb") as f:
+        f.write(b"legacy")
+    assert (await client.get("/download/old.txt", headers=headers)).status_code == 404
+    assert (await client.delete("/delete/old.txt", headers=headers)).status_code == 404
+
+@pytest.mark.asyncio
+async def test_list_files_paginated_and_sorted(client: AsyncClient, upload_dir: str, headers): # type: ignore[no-untyped-def]
+    sizes = {"c.txt": 30, "a.png": 10, "e.pdf": 50, "b.txt": 20, "d.txt": 20}
+    for name, size in sizes.items():
+        response = await client.post("/upload", files={"file": (name, name.encode() * size)}, headers=headers)
+        assert response.status_code == 200
+
+    async def listing(**params: str | int) -> list[list[str]]:
+        pages, cursor = [], None
+        while True:
+            query = {**params, **({"cursor": cursor} if cursor else {})}
+            response = await client.get("/files", params=query, headers=headers)
+            assert response.status_code == 200
+            data = response.json()
+            pages.append([f["name"] for f in data["files"]])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return pages
+
+    assert await listing(limit=2) == [["a.png", "b.txt"], ["c.txt", "d.txt"], ["e.pdf"]]
+    assert await listing(sort="size", order="desc", limit=2) == [["e.pdf", "c.txt"], ["d.txt", "b.txt"], ["a.png"]]
+    assert await listing(sort="created_at", limit=3) == [list(sizes)[:3], list(sizes)[3:]]
+    assert await listing(sort="created_at", order="desc", limit=10) == [list(sizes)[::-1]]
+
+    response = await client.get("/files", params={"sort": "size", "limit": 1}, headers=headers)
+    first = response.json()["files"][0]
+    assert first["name"] == "a.png"
+    assert first["size"] == len("a.png") * 10
+    assert first["content_type"] == "image/png"
+    assert first["created_at"] is not None
+    # A cursor only continues the listing it came from
+    response = await client.get(
+        "/files", params={"sort": "name", "cursor": response.json()["next_cursor"]}, headers=headers
+    )
+    assert response.status_code == 400
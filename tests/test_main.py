@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core import database
+from app.core.config import settings
+from app.main import create_app
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+def test_import_has_no_side_effects(tmp_path: Path):
+    # A fresh interpreter, so modules other tests imported don't count
+    check = (
+        "import sys, app.main\n"
+        "assert 'app.routers.tasks' not in sys.modules\n"
+        # What alembic imports: the models, but still no engine or driver
+        "import app.models.database\n"
+        "assert 'engine' not in vars(sys.modules['app.core.database'])\n"
+        "assert 'asyncpg' not in sys.modules\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", check], cwd=tmp_path, check=True,
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+    )
+    assert not (tmp_path / "uploads").exists()
+
+@pytest.mark.asyncio
+async def test_lifespan_creates_warms_and_disposes_engine(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(settings, "DB_POOL_WARMUP", 2)
+    app = create_app()
+
+    async with app.router.lifespan_context(app):
+        assert str(database.engine.url) == settings.DATABASE_URL
+        # Warm connections wait idle in the pool
+        assert database.engine.pool.checkedin() == 2
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/")).status_code == 200
+
+    assert "engine" not in vars(database)
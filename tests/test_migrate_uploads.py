@@ -0,0 +1,69 @@
+import hashlib
+import os
+import pytest
+from httpx import AsyncClient
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import migrate_uploads
+from app.core import database
+from app.core.security import create_access_token
+from app.models.database import Blob, File
+from app.routers import files
+from tests import conftest
+from tests.test_files import sharded, stored_blobs
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch) -> str: # type: ignore[no-untyped-def]
+    monkeypatch.setattr(files, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(database, "AsyncSessionLocal", conftest.testing_session_local)
+    return str(tmp_path)
+
+def write(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+@pytest.mark.asyncio
+async def test_migration_moves_old_layouts_into_shards(client: AsyncClient, db: AsyncSession, upload_dir: str, test_user): # type: ignore[no-untyped-def]
+    headers = {"Authorization": f"Bearer {create_access_token(test_user.username)}"}
+    shared, own = b"shared attachment", b"notes"
+    shared_sha, own_sha = hashlib.sha256(shared).hexdigest(), hashlib.sha256(own).hexdigest()
+
+    # A blob stored before sharding, referenced by an uploaded file
+    response = await client.post("/upload", files={"file": ("attachment.pdf", shared)}, headers=headers)
+    assert response.status_code == 200
+    os.rename(os.path.join(upload_dir, sharded(shared_sha)), os.path.join(upload_dir, "blobs", shared_sha))
+    # Files uploaded before blobs: one with contents already stored, one new,
+    # one superseded by a later upload and one whose owner is gone
+    write(os.path.join(upload_dir, f"{test_user.id}_copy.pdf"), shared)
+    write(os.path.join(upload_dir, f"{test_user.id}_notes.txt"), own)
+    write(os.path.join(upload_dir, f"{test_user.id}_attachment.pdf"), b"older version")
+    write(os.path.join(upload_dir, "999_orphan.txt"), b"nobody's")
+    # An upload in progress
+    write(os.path.join(upload_dir, ".upload-0123456789abcdef.part"), b"partial")
+
+    assert await migrate_uploads.migrate(upload_dir, batch_size=2, pause=0, dry_run=True) == 5
+    assert await migrate_uploads.migrate(upload_dir, batch_size=2, pause=0, dry_run=False) == 1
+
+    assert stored_blobs(upload_dir) == sorted([sharded(shared_sha), sharded(own_sha)])
+    assert sorted(os.listdir(upload_dir)) == [".upload-0123456789abcdef.part", "999_orphan.txt", "blobs"]
+    db.expire_all()
+    rows = (await db.execute(select(File.name, File.blob_sha256, File.size).order_by(File.name))).all()
+    assert rows == [
+        ("attachment.pdf", shared_sha, len(shared)),
+        ("copy.pdf", shared_sha, len(shared)),
+        ("notes.txt", own_sha, len(own)),
+    ]
+    blobs = dict((await db.execute(select(Blob.sha256, Blob.ref_count))).all())
+    assert blobs == {shared_sha: 2, own_sha: 1}
+
+    for name, content in (("attachment.pdf", shared), ("copy.pdf", shared), ("notes.txt", own)):
+        response = await client.get(f"/download/{name}", headers=headers)
+        assert response.status_code == 200
+        assert response.content == content
+
+    # Resumable: what is left is only what it can't move
+    assert await migrate_uploads.migrate(upload_dir, batch_size=2, pause=0, dry_run=False) == 1
+    assert stored_blobs(upload_dir) == sorted([sharded(shared_sha), sharded(own_sha)])
@@ -0,0 +1,102 @@
+import time
+from pathlib import Path
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database, security
+from app.core.database import Base
+from app.crud.user import user_cache
+from app.main import task_app as app
+from app.models.database import User
+
+def session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+@pytest_asyncio.fixture
+async def engines(tmp_path: Path) -> AsyncGenerator[tuple[AsyncEngine, AsyncEngine], None]:
+    # Two independent SQLite files: nothing replicates, so what a read returns
+    # shows which database served it
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [
+                {"id": 1, "username": "reader", "email": "reader@example.com", "hashed_password": "x"}
+            ])
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+@pytest.mark.asyncio
+async def test_reads_use_replicas_except_right_after_own_writes(engines, tmp_path: Path, monkeypatch):
+    primary, replica = engines
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(database, "AsyncSessionLocal", session_factory(primary))
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [session_factory(replica)])
+    user_cache.clear()
+    database.recent_writers.clear()
+    database.unavailable_replicas.clear()
+
+    headers = {"Authorization": f"Bearer {security.create_access_token('reader')}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        async def titles() -> list[str]:
+            response = await client.get("/tasks/", headers=headers)
+            assert response.status_code == 200
+            return [t["title"] for t in response.json()["tasks"]]
+
+        response = await client.post("/tasks/", json={"title": "Written"}, headers=headers)
+        assert response.status_code == 201
+        # Inside the read-your-writes window the writer reads from the primary
+        assert await titles() == ["Written"]
+
+        # Another worker never saw the write, but the client's cookie carries it
+        database.recent_writers.clear()
+        assert await titles() == ["Written"]
+
+        # Forged or expired, the cookie is ignored
+        mark = security.sign_write_mark(time.time())
+        client.cookies.set("last_write", mark[:-1] + ("1" if mark.endswith("0") else "0"))
+        assert await titles() == []
+        client.cookies.set("last_write", security.sign_write_mark(time.time() - 60))
+        assert await titles() == []
+        client.cookies.clear()
+
+        # Once it has passed, reads go to the replica, which never received the write
+        assert await titles() == []
+
+        # Replicas take turns; the primary's file stands in as a second replica
+        monkeypatch.setattr(database, "ReplicaSessionLocals", [session_factory(replica), session_factory(primary)])
+        assert sorted([await titles(), await titles()]) == [[], ["Written"]]
+
+        # An unreachable replica is skipped in favour of the next one, then the primary
+        monkeypatch.setattr(database, "ReplicaSessionLocals", [session_factory(unreachable)])
+        assert await titles() == ["Written"]
+        assert database.unavailable_replicas.get(0)
+
+    await unreachable.dispose()
+
+@pytest.mark.asyncio
+async def test_new_users_authenticate_before_the_replica_has_them(engines, monkeypatch):
+    primary, replica = engines
+    monkeypatch.setattr(database, "AsyncSessionLocal", session_factory(primary))
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [session_factory(replica)])
+    user_cache.clear()
+    database.recent_writers.clear()
+    database.unavailable_replicas.clear()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/auth/register", json={
+            "username": "newcomer", "email": "newcomer@example.com", "password": "TestPassword123"
+        })
+        assert response.status_code == 201
+        # A client that keeps no cookies, served by a worker that didn't register it
+        client.cookies.clear()
+        headers = {"Authorization": f"Bearer {security.create_access_token('newcomer')}"}
+        response = await client.get("/tasks/", headers=headers)
+        assert response.status_code == 200
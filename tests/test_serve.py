@@ -0,0 +1,68 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from app.core.database import Base
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+def test_serve_drains_in_flight_requests_on_sigterm(tmp_path: Path):
+    database = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", "0", "--workers", "2", "--graceful-timeout", "10"],
+        cwd=tmp_path, stderr=subprocess.PIPE, text=True,
+        env={**os.environ, "PYTHONPATH": str(SRC), "DATABASE_URL": f"sqlite+aiosqlite:///{database}"},
+    )
+    try:
+        assert server.stderr is not None
+        line = ""
+        while "Listening on" not in line:
+            line = server.stderr.readline()
+            assert line, "server exited before listening"
+        port = int(line.split(":")[-1].split()[0])
+        # Wait for a worker to finish its lifespan startup
+        deadline = time.monotonic() + 30
+        while b"200 OK" not in _request(port, b"GET / HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n"):
+            assert time.monotonic() < deadline
+
+        # A request whose body is still arriving when the server is told to stop
+        body = b"username=nobody&password=Secret123"
+        conn = socket.create_connection(("127.0.0.1", port))
+        conn.sendall(
+            b"POST /auth/login/access-token HTTP/1.1\r\nHost: test\r\n"
+            b"Content-Type: application/x-www-form-urlencoded\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body[:10]
+        )
+        time.sleep(0.5)
+        server.send_signal(signal.SIGTERM)
+        time.sleep(0.5)
+        conn.sendall(body[10:])
+        response = conn.recv(65536)
+        conn.close()
+
+        # Unknown user, but answered in full rather than cut off
+        assert response.startswith(b"HTTP/1.1 401 ")
+        assert server.wait(timeout=30) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+def _request(port: int, raw: bytes) -> bytes:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as conn:
+            conn.sendall(raw)
+            return conn.recv(65536)
+    except OSError:
+        time.sleep(0.1)
+        return b""
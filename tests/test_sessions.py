@@ -0,0 +1,105 @@
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List
+
+import aiofiles
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database, security
+from app.core.database import Base
+from app.crud.user import user_cache
+from app.main import task_app as app
+from app.routers import files
+
+@pytest_asyncio.fixture
+async def engine(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncEngine, None]:
+    # The real request dependencies against a file database with a queue pool,
+    # so checkouts and checkins behave as they do in production
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(
+        database, "AsyncSessionLocal", async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [])
+    user_cache.clear()
+    yield engine
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_connections_are_not_held_through_slow_work(engine: AsyncEngine, tmp_path: Path, monkeypatch):
+    holds: List[float] = []
+    checked_out_at: Dict[int, float] = {}
+
+    def on_checkout(dbapi_conn, record, proxy): # type: ignore[no-untyped-def]
+        checked_out_at[id(record)] = time.perf_counter()
+
+    def on_checkin(dbapi_conn, record): # type: ignore[no-untyped-def]
+        holds.append(time.perf_counter() - checked_out_at.pop(id(record)))
+
+    event.listen(engine.sync_engine.pool, "checkout", on_checkout)
+    event.listen(engine.sync_engine.pool, "checkin", on_checkin)
+
+    # Connections checked out while bcrypt or file I/O runs
+    during: Dict[str, int] = {}
+    executor = security.password_executor
+    real_hash, real_verify, real_open = executor.hash, executor.verify, aiofiles.open
+
+    async def hash(*args: Any) -> str:
+        during["hash"] = engine.sync_engine.pool.checkedout()
+        return await real_hash(*args)
+
+    async def verify(*args: Any) -> bool:
+        during["verify"] = engine.sync_engine.pool.checkedout()
+        return await real_verify(*args)
+
+    def open_upload(*args: Any, **kwargs: Any): # type: ignore[no-untyped-def]
+        during["upload"] = engine.sync_engine.pool.checkedout()
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(executor, "hash", hash)
+    monkeypatch.setattr(executor, "verify", verify)
+    monkeypatch.setattr(aiofiles, "open", open_upload)
+    monkeypatch.setattr(files, "UPLOAD_DIR", str(tmp_path))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/auth/register", json={
+            "username": "holder", "email": "holder@example.com", "password": "HolderPassword123"
+        })
+        assert response.status_code == 201
+        response = await client.post("/auth/login", json={"username": "holder", "password": "HolderPassword123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        holds.clear()
+        start = time.perf_counter()
+        response = await client.post("/upload", files={"file": ("notes.txt", b"x" * 1024)}, headers=headers)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200
+
+    assert during == {"hash": 0, "verify": 0, "upload": 0}
+    # The upload looked the user up, then recorded the file once the body was
+    # received: two short holds, neither spanning the request
+    assert len(holds) == 2
+    assert sum(holds) < elapsed
+    assert engine.sync_engine.pool.checkedout() == 0
+
+@pytest.mark.asyncio
+async def test_release_connection_keeps_uncommitted_writes(engine: AsyncEngine):
+    async with database.AsyncSessionLocal() as session:
+        await session.execute(Base.metadata.tables["users"].select())
+        assert session.in_transaction()
+        await database.release_connection(session)
+        assert not session.in_transaction()
+
+        await session.execute(Base.metadata.tables["users"].insert().values(
+            username="pending", email="pending@example.com", hashed_password="x"
+        ))
+        await database.release_connection(session)
+        # The insert is still part of the open transaction and can be committed
+        assert session.in_transaction()
+        await session.commit()
+        assert engine.sync_engine.pool.checkedout() == 0
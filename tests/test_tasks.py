@@ -1,5 +1,22 @@
+import csv
+import io
+import json
 import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any
 from httpx import AsyncClient
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import claims_cache, create_access_token
+from app.crud.task import task as crud_task
+from app.crud.user import user as crud_user
+from app.models.database import Task
+from app.models.task import TaskStatus
+from app.models.user import UserCreate
+from tests.conftest import test_engine
 
 @pytest.mark.asyncio
 async def test_create_task(client: AsyncClient, test_user): # type: ignore[unused-argument]
@@ -48,8 +65,11 @@ async def test_get_tasks(client: AsyncClient, test_user): # type: ignore[unused-
     response = await client.get("/tasks/", headers=headers)
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 1
-    assert data[0]["title"] == "Test Task"
+    assert len(data["tasks"]) == 1
+    assert data["tasks"][0]["title"] == "Test Task"
+    assert data["total"] == 1
+    assert data["page"] == 1
+    assert data["next_cursor"] is None
 
 @pytest.mark.asyncio
 async def test_update_task(client: AsyncClient, test_user): # type: ignore[unused-argument]
@@ -82,3 +102,466 @@ async def test_update_task(client: AsyncClient, test_user): # type: ignore[unuse
     data = response.json()
     assert data["title"] == "Updated Title"
     assert data["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_get_tasks_cursor_pagination(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for i in range(5):
+        await client.post("/tasks/", json={"title": f"Task {i}"}, headers=headers)
+
+    # Walk the pages following X-Next-Cursor
+    titles: list[str] = []
+    pages: list[int] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = await client.get("/tasks/", params=params, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        titles.extend(task["title"] for task in data["tasks"])
+        pages.append(data["page"])
+        assert data["total"] == 5
+        assert response.headers.get("X-Next-Cursor") == data["next_cursor"]
+        if not data["next_cursor"]:
+            break
+        params = {"limit": 2, "cursor": data["next_cursor"]}
+
+    assert titles == [f"Task {i}" for i in range(5)]
+    assert pages == [1, 2, 3]
+
+    # A tampered cursor is rejected instead of silently restarting
+    response = await client.get("/tasks/", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_task_pages_seek_by_index(db: AsyncSession):
+    # Every page, unfiltered or not, seeks on an index in id order: no scan
+    # and sort of all the owner's tasks
+    filters: list[dict[str, Any]] = [{}, {"after_id": 100}, {"status": TaskStatus.PENDING, "after_id": 100}]
+    for kwargs in filters:
+        query = crud_task._owner_page_query(
+            select(Task), owner_id=1, skip=0, limit=50,
+            priority=kwargs.get("priority"), status=kwargs.get("status"), after_id=kwargs.get("after_id")
+        )
+        compiled = query.compile(test_engine.sync_engine, compile_kwargs={"literal_binds": True})
+        plan = " ".join(row[-1] for row in await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+        assert "USING INDEX" in plan
+        assert "TEMP B-TREE" not in plan
+
+@pytest.mark.asyncio
+async def test_bulk_create_update_delete(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Invalid items are reported by position, the rest are created
+    response = await client.post(
+        "/tasks/bulk",
+        json=[{"title": "Bulk 0"}, {"title": "Bulk 1"}, {"priority": "high"}, {"title": "Bulk 3", "priority": "urgent"}],
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [task["title"] for task in data["tasks"]] == ["Bulk 0", "Bulk 1", "Bulk 3"]
+    assert [err["index"] for err in data["errors"]] == [2]
+    ids = [task["id"] for task in data["tasks"]]
+
+    response = await client.patch(
+        "/tasks/bulk",
+        json=[{"id": ids[1], "title": "Renamed"}, {"id": 9999, "status": "completed"}, {"id": ids[0], "status": "completed"}],
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [(task["id"], task["title"], task["status"]) for task in data["tasks"]] == [
+        (ids[1], "Renamed", "pending"),
+        (ids[0], "Bulk 0", "completed"),
+    ]
+    assert data["errors"] == [{"index": 1, "id": 9999, "detail": "Task not found"}]
+
+    # A null for a required column is that item's error, not a failed batch
+    response = await client.patch(
+        "/tasks/bulk", json=[{"id": ids[0], "title": None}, {"id": ids[1], "description": None}], headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [(task["id"], task["description"]) for task in data["tasks"]] == [(ids[1], None)]
+    assert data["errors"] == [{"index": 0, "id": ids[0], "detail": "title: may not be null"}]
+
+    response = await client.request("DELETE", "/tasks/bulk", json={"ids": [ids[2], 9999, ids[0]]}, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deleted"] == [ids[2], ids[0]]
+    assert [err["index"] for err in data["errors"]] == [1]
+
+    response = await client.get("/tasks/", headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [ids[1]]
+
+@pytest.mark.asyncio
+async def test_update_and_delete_round_trips(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    task_id = (await client.post("/tasks/", json={"title": "Task"}, headers=headers)).json()["id"]
+
+    # Record every statement and commit sent to the database
+    round_trips: list[str] = []
+    def on_execute(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+        round_trips.append(statement.split()[0])
+    def on_commit(conn):  # type: ignore[no-untyped-def]
+        round_trips.append("COMMIT")
+    event.listen(test_engine.sync_engine, "before_cursor_execute", on_execute)
+    event.listen(test_engine.sync_engine, "commit", on_commit)
+    try:
+        response = await client.put(f"/tasks/{task_id}", json={"title": "Renamed"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["title"] == "Renamed"
+        # UPDATE ... RETURNING, COMMIT (was 5 with the user lookup and get/refresh
+        # path; the user now comes from the cache filled by the create request),
+        # plus the upsert bumping the owner's list version for ETags
+        assert round_trips == ["UPDATE", "INSERT", "COMMIT"]
+
+        round_trips.clear()
+        response = await client.delete(f"/tasks/{task_id}", headers=headers)
+        assert response.status_code == 200
+        # The per-owner counter upsert rides in the same transaction
+        assert round_trips == ["DELETE", "INSERT", "COMMIT"]
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", on_execute)
+        event.remove(test_engine.sync_engine, "commit", on_commit)
+
+@pytest.mark.asyncio
+async def test_update_and_delete_other_users_task(client: AsyncClient, db: AsyncSession, test_user): # type: ignore[unused-argument]
+    await crud_user.create(db, obj_in=UserCreate(
+        username="otheruser", email="other@example.com", password="OtherPassword123"
+    ))
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "otheruser", "password": "OtherPassword123"}
+    )
+    other_headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    task_id = (await client.post("/tasks/", json={"title": "Private"}, headers=other_headers)).json()["id"]
+
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    response = await client.put(f"/tasks/{task_id}", json={"title": "Mine now"}, headers=headers)
+    assert response.status_code == 403
+    response = await client.delete(f"/tasks/{task_id}", headers=headers)
+    assert response.status_code == 403
+    response = await client.put(f"/tasks/{task_id + 1}", json={"title": "Missing"}, headers=headers)
+    assert response.status_code == 404
+    response = await client.delete(f"/tasks/{task_id + 1}", headers=headers)
+    assert response.status_code == 404
+
+    response = await client.get(f"/tasks/{task_id}", headers=other_headers)
+    assert response.json()["title"] == "Private"
+
+@pytest.mark.asyncio
+async def test_task_list_counts_follow_writes(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = (await client.post("/tasks/", json={"title": "One", "priority": "high"}, headers=headers)).json()
+    response = await client.post(
+        "/tasks/bulk",
+        json=[{"title": "Two"}, {"title": "Three", "priority": "high"}, {"title": "Four", "priority": "low"}],
+        headers=headers
+    )
+    bulk_ids = [task["id"] for task in response.json()["tasks"]]
+    await client.put(f"/tasks/{first['id']}", json={"status": "completed"}, headers=headers)
+    await client.patch("/tasks/bulk", json=[{"id": bulk_ids[0], "priority": "urgent"}], headers=headers)
+    await client.delete(f"/tasks/{bulk_ids[2]}", headers=headers)
+
+    data = (await client.get("/tasks/", headers=headers)).json()
+    assert data["total"] == 3
+    assert data["by_status"] == {"pending": 2, "completed": 1}
+    assert data["by_priority"] == {"high": 2, "urgent": 1}
+
+    # total honours the same filters as the listing
+    data = (await client.get("/tasks/", params={"priority": "high", "status": "pending"}, headers=headers)).json()
+    assert data["total"] == len(data["tasks"]) == 1
+
+@pytest.mark.asyncio
+async def test_counter_rows_are_locked_in_one_order(db: AsyncSession, monkeypatch):
+    # Opposite moves touch the same two counter rows, and must upsert (lock) them in the same order
+    written: list[list[tuple[Any, ...]]] = []
+
+    async def execute(stmt, params=None, **kwargs): # type: ignore[no-untyped-def]
+        written.append([(row["owner_id"], row["status"], row["priority"]) for row in params])
+
+    monkeypatch.setattr(db, "execute", execute)
+    for old, new in ((TaskStatus.PENDING, TaskStatus.COMPLETED), (TaskStatus.COMPLETED, TaskStatus.PENDING)):
+        deltas = crud_task._deltas(
+            added=[SimpleNamespace(owner_id=1, status=new, priority=None)],
+            removed=[SimpleNamespace(owner_id=1, status=old, priority=None)],
+        )
+        await crud_task._apply_counts(db, deltas)
+    assert written[0] == written[1]
+
+@pytest.mark.asyncio
+async def test_export_tasks(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    await client.post(
+        "/tasks/bulk",
+        json=[{"title": f"Task {i}", "description": "a, \"quoted\" line"} for i in range(3)],
+        headers=headers
+    )
+
+    response = await client.get("/tasks/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Task 0", "Task 1", "Task 2"]
+    assert rows[0]["priority"] == "medium"
+    assert rows[0]["description"] == 'a, "quoted" line'
+
+    response = await client.get("/tasks/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert [record["title"] for record in records] == ["Task 0", "Task 1", "Task 2"]
+    assert records[2]["status"] == "pending"
+    assert records[2]["description"] == 'a, "quoted" line'
+
+@pytest.mark.asyncio
+async def test_search_tasks(client: AsyncClient, db: AsyncSession, test_user): # type: ignore[unused-argument]
+    await crud_user.create(db, obj_in=UserCreate(
+        username="otheruser", email="other@example.com", password="OtherPassword123"
+    ))
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "otheruser", "password": "OtherPassword123"}
+    )
+    other_headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    await client.post("/tasks/", json={"title": "Invoice for Acme"}, headers=other_headers)
+
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    await client.post("/tasks/bulk", json=[
+        {"title": "Call the plumber", "description": "Kitchen sink invoices are overdue"},
+        {"title": "Send invoices", "description": "Monthly billing"},
+        {"title": "Water plants"},
+    ], headers=headers)
+
+    # Stemmed match on both columns, title hits first, other users' tasks excluded
+    response = await client.get("/tasks/search", params={"q": "invoice"}, headers=headers)
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Send invoices", "Call the plumber"]
+
+    # Every word has to match
+    response = await client.get("/tasks/search", params={"q": "invoice kitchen"}, headers=headers)
+    assert [t["title"] for t in response.json()] == ["Call the plumber"]
+
+    # FTS5 syntax in user input is searched for literally rather than parsed
+    response = await client.get("/tasks/search", params={"q": 'plants" OR NEAR(*'}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+    # Updates and deletes keep the index current
+    tasks = (await client.get("/tasks/", headers=headers)).json()["tasks"]
+    water = next(t for t in tasks if t["title"] == "Water plants")
+    await client.put(f"/tasks/{water['id']}", json={"description": "Then pay the invoice"}, headers=headers)
+    send = next(t for t in tasks if t["title"] == "Send invoices")
+    await client.delete(f"/tasks/{send['id']}", headers=headers)
+    response = await client.get("/tasks/search", params={"q": "invoice"}, headers=headers)
+    assert {t["title"] for t in response.json()} == {"Call the plumber", "Water plants"}
+
+@pytest.mark.asyncio
+async def test_task_stats(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    now = datetime.now(timezone.utc)
+    created = (await client.post("/tasks/bulk", json=[
+        {"title": "Late", "priority": "high", "due_date": (now - timedelta(days=1)).isoformat()},
+        {"title": "Late but done", "due_date": (now - timedelta(days=1)).isoformat()},
+        {"title": "Soon", "due_date": (now + timedelta(hours=3)).isoformat()},
+        {"title": "Next month", "priority": "low", "due_date": (now + timedelta(days=30)).isoformat()},
+        {"title": "Someday"},
+    ], headers=headers)).json()["tasks"]
+    await client.patch("/tasks/bulk", json=[{"id": created[1]["id"], "status": "completed"}], headers=headers)
+
+    response = await client.get("/tasks/stats", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 5
+    assert data["by_status"] == {"pending": 4, "completed": 1}
+    assert data["by_priority"] == {"high": 1, "medium": 3, "low": 1}
+    assert data["overdue"] == 1
+    assert data["due_soon"] == 1
+
+    # Served from the cache until a write for this owner, by any worker, moves
+    # their version: nothing has to reach this process to invalidate it
+    queries = []
+
+    def on_execute(conn, cursor, statement, *args): # type: ignore[no-untyped-def]
+        queries.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        assert (await client.get("/tasks/stats", headers=headers)).json() == data
+        assert not any("GROUP BY" in q for q in queries)
+
+        await client.put(f"/tasks/{created[0]['id']}", json={"status": "completed"}, headers=headers)
+        data = (await client.get("/tasks/stats", headers=headers)).json()
+        assert any("GROUP BY" in q for q in queries)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", on_execute)
+    assert data["overdue"] == 0
+    assert data["by_status"] == {"pending": 3, "completed": 2}
+
+@pytest.mark.asyncio
+async def test_task_list_matches_task_response(client: AsyncClient, db: AsyncSession, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    await client.post("/tasks/bulk", json=[
+        {"title": "Dated", "description": "With a due date", "priority": "urgent", "due_date": "2030-01-02T03:04:05"},
+        {"title": "Plain"},
+    ], headers=headers)
+    # A row written outside the ORM, without status or priority
+    await db.execute(Task.__table__.insert().values(title="Raw", owner_id=test_user.id, status=None, priority=None))
+    await db.commit()
+
+    listed = (await client.get("/tasks/", headers=headers)).json()["tasks"]
+    assert len(listed) == 3
+    for task in listed[:2]:
+        single = (await client.get(f"/tasks/{task['id']}", headers=headers)).json()
+        # Same fields, values and key order as the response_model path
+        assert list(task.items()) == list(single.items())
+    # NULLs are listed as the column defaults
+    assert listed[2]["status"] == "pending" and listed[2]["priority"] == "medium"
+
+@pytest.mark.asyncio
+async def test_conditional_get(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    task_id = (await client.post("/tasks/", json={"title": "Polled"}, headers=headers)).json()["id"]
+
+    response = await client.get(f"/tasks/{task_id}", headers=headers)
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+    list_etag = (await client.get("/tasks/", headers=headers)).headers["ETag"]
+
+    # Unchanged: 304 with no body, whichever validator is sent
+    for conditional in ({"If-None-Match": etag}, {"If-None-Match": f'"other", W/{etag}'}, {"If-Modified-Since": last_modified}):
+        response = await client.get(f"/tasks/{task_id}", headers={**headers, **conditional})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    response = await client.get("/tasks/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 304 and response.content == b""
+    # Other pages and filters have their own ETags
+    response = await client.get("/tasks/", params={"status": "pending"}, headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+
+    # Any write changes both ETags, even within the same second
+    await client.put(f"/tasks/{task_id}", json={"title": "Renamed"}, headers=headers)
+    response = await client.get(f"/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Renamed"
+    response = await client.get("/tasks/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+
+    # Deleting a task changes the list ETag too, including when its group empties
+    list_etag = response.headers["ETag"]
+    await client.delete(f"/tasks/{task_id}", headers=headers)
+    response = await client.get("/tasks/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+    assert response.json()["total"] == 0 and response.json()["by_status"] == {}
+
+def _metric_value(body: str, series: str) -> float:
+    for line in body.splitlines():
+        name, _, value = line.rpartition(" ")
+        if name == series:
+            return float(value)
+    return 0.0
+
+@pytest.mark.asyncio
+async def test_metrics_and_server_timing(client: AsyncClient, test_user, monkeypatch): # type: ignore[unused-argument]
+    login_response = await client.post(
+        "/auth/login/access-token",
+        data={"username": "testuser", "password": "TestPassword123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    await client.post("/tasks/", json={"title": "Timed"}, headers=headers)
+    # Metrics are per process: earlier tests' requests are already counted
+    listed_before = _metric_value(
+        (await client.get("/metrics")).text, 'http_request_db_queries_bucket{method="GET",route="/tasks/",le="2"}'
+    )
+
+    # Below the threshold responses carry no Server-Timing header
+    response = await client.get("/tasks/", headers=headers)
+    assert "server-timing" not in response.headers
+
+    monkeypatch.setattr(settings, "SERVER_TIMING_THRESHOLD_SECONDS", 0)
+    response = await client.get("/tasks/", headers=headers)
+    timing = response.headers["server-timing"]
+    assert timing.startswith("auth;dur=")
+    # The counter rows and the page; the user comes from the user cache
+    assert 'desc="2 queries"' in timing
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    # Labelled by route template, not the raw path
+    assert 'http_request_duration_seconds_count{method="GET",route="/tasks/",status="200"}' in body
+    assert _metric_value(body, 'http_request_db_queries_bucket{method="GET",route="/tasks/",le="2"}') == listed_before + 2
+    assert 'http_request_duration_seconds_count{method="POST",route="/tasks/",status="201"}' in body
+
+    await client.get("/tasks/no-such-route/really")
+    assert 'route="unmatched",status="404"' in (await client.get("/metrics")).text
+
+@pytest.mark.asyncio
+async def test_cache_metrics(client: AsyncClient, test_user): # type: ignore[unused-argument]
+    # An earlier test may have cached a token for the same user and second
+    claims_cache.clear()
+    headers = {"Authorization": f"Bearer {create_access_token('testuser')}"}
+    series = [
+        f'cache_{kind}_total{{cache="{cache}"}}'
+        for cache in ("users", "token_claims", "task_stats") for kind in ("hits", "misses")
+    ]
+    body = (await client.get("/metrics")).text
+    before = {name: _metric_value(body, name) for name in series}
+
+    # Each cache misses on the first request and answers the second
+    for _ in range(2):
+        assert (await client.get("/tasks/stats", headers=headers)).status_code == 200
+
+    body = (await client.get("/metrics")).text
+    assert {name: _metric_value(body, name) - before[name] for name in series} == dict.fromkeys(series, 1)
+    assert '# TYPE cache_entries gauge' in body
+    assert 'cache_entries{cache="task_stats"} 1' in body